@@ -1,8 +1,11 @@
 import asyncio
+import contextlib
+import functools
 import sqlite3
 import threading
 import time
-from contextlib import closing
+import weakref
+from collections.abc import Callable, Iterator
 from pathlib import Path
 from typing import Any
 
@@ -10,13 +13,20 @@ import orjson
 
 TTL = 300  # Retention period in Home Assistant is set to a fixed 5 minutes of idle time.
 INDEX_TTL = 2592000  # 30 days
+PRUNE_BATCH_SIZE = 1000
 DB_PATH = Path("/config/cache.db")
 
 _CACHE_READY = False
 _CACHE_READY_LOCK = threading.Lock()
-_INDEX_LOCKS: dict[str, asyncio.Lock] = {}
-_INDEX_LOCKS_COUNTS: dict[str, int] = {}
-_INDEX_LOCKS_GUARD = threading.Lock()
+_CACHE_GENERATION = 0
+_DB_LOCAL = threading.local()
+
+_SQL_SELECT_ENTRY = "SELECT value, expires_at FROM cache_entries WHERE key = ?"
+_SQL_UPSERT_ENTRY = (
+    "INSERT INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?) "
+    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at"
+)
+_INDEX_LOCKS: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
 
 
 class _IndexLockContext:
@@ -25,61 +35,95 @@ class _IndexLockContext:
         self.lock = None
 
     async def __aenter__(self):
-        key = self.key
-        with _INDEX_LOCKS_GUARD:
-            if key not in _INDEX_LOCKS:
-                _INDEX_LOCKS[key] = asyncio.Lock()
-                _INDEX_LOCKS_COUNTS[key] = 0
-            _INDEX_LOCKS_COUNTS[key] += 1
-            self.lock = _INDEX_LOCKS[key]
-
-        await self.lock.acquire()
+        # Holders keep a strong reference; the entry disappears once the last one lets go.
+        lock = _INDEX_LOCKS.get(self.key)
+        if lock is None:
+            lock = asyncio.Lock()
+            _INDEX_LOCKS[self.key] = lock
+        self.lock = lock
+
+        await lock.acquire()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         if self.lock:
             self.lock.release()
-
-        key = self.key
-        with _INDEX_LOCKS_GUARD:
-            if key in _INDEX_LOCKS_COUNTS:
-                _INDEX_LOCKS_COUNTS[key] -= 1
-                if _INDEX_LOCKS_COUNTS[key] <= 0:
-                    _INDEX_LOCKS.pop(key, None)
-                    _INDEX_LOCKS_COUNTS.pop(key, None)
+            self.lock = None
 
 
 def _acquire_index_lock(key: str):
     return _IndexLockContext(key)
 
 
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+def _close_db_connection() -> None:
+    """Close and discard the pooled SQLite connection of the current thread."""
+    conn = getattr(_DB_LOCAL, "conn", None)
+    _DB_LOCAL.conn = None
+    if conn is not None:
+        with contextlib.suppress(sqlite3.Error):
+            conn.close()
+
+
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
 def _get_db_connection() -> sqlite3.Connection:
-    """Create a configured SQLite connection with optimized PRAGMAs."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA synchronous=NORMAL;")
-    conn.execute("PRAGMA temp_store=MEMORY;")
-    conn.execute("PRAGMA busy_timeout=3000;")
+    """Return the pooled SQLite connection of the current thread, opening it on first use."""
+    conn = getattr(_DB_LOCAL, "conn", None)
+    if conn is not None and getattr(_DB_LOCAL, "generation", None) == _CACHE_GENERATION:
+        return conn
+    _close_db_connection()
+    conn = sqlite3.connect(DB_PATH, cached_statements=256)
+    try:
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute("PRAGMA temp_store=MEMORY;")
+        conn.execute("PRAGMA busy_timeout=5000;")
+        conn.execute("PRAGMA cache_size=-65536;")
+        conn.execute("PRAGMA mmap_size=1073741824;")
+        conn.execute("PRAGMA optimize=0x10002;")
+    except sqlite3.Error:
+        conn.close()
+        raise
+    _DB_LOCAL.conn = conn
+    _DB_LOCAL.generation = _CACHE_GENERATION
     return conn
 
 
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+@contextlib.contextmanager
+def _cache_transaction() -> Iterator[sqlite3.Cursor]:
+    """Run the enclosed statements in a single IMMEDIATE transaction on the pooled connection."""
+    conn = _get_db_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn.cursor()
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
 def _ensure_cache_db() -> None:
     """Initialize the cache database schema and directory."""
+    global _CACHE_GENERATION
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with closing(_get_db_connection()) as conn:
-        conn.execute("PRAGMA journal_mode=WAL;")
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS cache_entries
-            (
-                key        TEXT PRIMARY KEY,
-                value      TEXT    NOT NULL,
-                expires_at INTEGER NOT NULL
-            )
-            """
+    # Invalidate pooled connections so every thread reopens against the (re)created file.
+    _CACHE_GENERATION += 1
+    conn = _get_db_connection()
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS cache_entries
+        (
+            key        TEXT PRIMARY KEY,
+            value      TEXT    NOT NULL,
+            expires_at INTEGER NOT NULL
         )
-        conn.commit()
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache_entries(expires_at);")
+    conn.commit()
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
@@ -104,6 +148,22 @@ def _reset_cache_ready() -> None:
     global _CACHE_READY
     with _CACHE_READY_LOCK:
         _CACHE_READY = False
+    _close_db_connection()
+
+
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+def _with_db_retry(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Retry a cache operation once on a fresh connection after an OperationalError."""
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        try:
+            return func(*args, **kwargs)
+        except sqlite3.OperationalError:
+            _reset_cache_ready()
+            return func(*args, **kwargs)
+
+    return wrapper
 
 
 def _cache_prepare_db_sync(force: bool = False) -> bool:
@@ -113,107 +173,135 @@ def _cache_prepare_db_sync(force: bool = False) -> bool:
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+@_with_db_retry
 def _prune_expired_sync() -> int:
     """Remove expired entries from the cache database."""
-    for attempt in range(2):
-        try:
-            _ensure_cache_db_once()
-            now = int(time.time())
-            with closing(_get_db_connection()) as conn:
-                cur = conn.cursor()
-                cur.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
-                rowcount = getattr(cur, "rowcount", -1)
-                removed = rowcount if rowcount and rowcount > 0 else 0
-                conn.commit()
-            return removed
-        except sqlite3.OperationalError:
-            _reset_cache_ready()
-            if attempt == 0:
-                time.sleep(0.1)
-                continue
-            raise
-    return 0
+    _ensure_cache_db_once()
+    now = time.time_ns() // 1_000_000_000
+    removed = 0
+    while True:
+        # Short batches keep the writer lock brief between sweeps.
+        with _cache_transaction() as cur:
+            cur.execute(
+                """
+                DELETE
+                FROM cache_entries
+                WHERE rowid IN (SELECT rowid
+                                FROM cache_entries
+                                WHERE expires_at <= ?
+                                LIMIT ?)
+                """,
+                (now, PRUNE_BATCH_SIZE),
+            )
+            batch = cur.rowcount
+        removed += batch
+        if batch < PRUNE_BATCH_SIZE:
+            break
+    _get_db_connection().execute("PRAGMA optimize;")
+    return removed
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
-def _cache_get_sync(key: str) -> str | None:
-    """Fetch a cache record synchronously by key."""
-    for attempt in range(2):
-        try:
-            _ensure_cache_db_once(force=attempt == 1)
-            now = int(time.time())
-            with closing(_get_db_connection()) as conn:
-                conn.row_factory = sqlite3.Row
-                cur = conn.cursor()
-                cur.execute(
-                    """
-                    SELECT value
-                    FROM cache_entries
-                    WHERE key = ?
-                      AND expires_at > ?
-                    """,
-                    (key, now),
-                )
-                row = cur.fetchone()
-            return row["value"] if row else None
-        except sqlite3.OperationalError:
-            _reset_cache_ready()
-            if attempt == 0:
-                time.sleep(0.1)
-                continue
-            raise
-    return None
+@_with_db_retry
+def _cache_get_sync(key: str) -> bytes | str | None:
+    """Fetch a cache record synchronously by key (raw JSON bytes, or str for legacy rows)."""
+    _ensure_cache_db_once()
+    now = time.time_ns() // 1_000_000_000
+    cur = _get_db_connection().cursor()
+    cur.execute(_SQL_SELECT_ENTRY, (key,))
+    row = cur.fetchone()
+    if not row:
+        return None
+    if row["expires_at"] <= now:
+        with _cache_transaction() as cur:
+            cur.execute(
+                "DELETE FROM cache_entries WHERE key = ? AND expires_at <= ?",
+                (key, now),
+            )
+        return None
+    return row["value"]
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
-def _cache_set_sync(key: str, value: str, ttl_seconds: int) -> bool:
+@_with_db_retry
+def _cache_set_sync(key: str, value: bytes, ttl_seconds: int) -> bool:
     """Persist or update a cache entry synchronously."""
-    for attempt in range(2):
-        try:
-            _ensure_cache_db_once(force=attempt == 1)
-            now = int(time.time())
-            expires_at = now + ttl_seconds
-            with closing(_get_db_connection()) as conn:
-                cur = conn.cursor()
-                cur.execute(
-                    """
-                    INSERT INTO cache_entries (key, value, expires_at)
-                    VALUES (?, ?, ?)
-                    ON CONFLICT(key) DO UPDATE SET value      = excluded.value,
-                                                   expires_at = excluded.expires_at
-                    """,
-                    (key, value, expires_at),
-                )
-                conn.commit()
-            return True
-        except sqlite3.OperationalError:
-            _reset_cache_ready()
-            if attempt == 0:
-                time.sleep(0.1)
-                continue
-            raise
-    return False
+    _ensure_cache_db_once()
+    now = time.time_ns() // 1_000_000_000
+    expires_at = now + ttl_seconds
+    with _cache_transaction() as cur:
+        cur.execute(_SQL_UPSERT_ENTRY, (key, value, expires_at))
+    return True
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+@_with_db_retry
 def _cache_delete_sync(key: str) -> int:
     """Remove a cache entry synchronously by key."""
-    for attempt in range(2):
-        try:
-            _ensure_cache_db_once(force=attempt == 1)
-            with closing(_get_db_connection()) as conn:
-                cur = conn.cursor()
-                cur.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
-                deleted = cur.rowcount if cur.rowcount is not None else 0
-                conn.commit()
-            return max(deleted, 0)
-        except sqlite3.OperationalError:
-            _reset_cache_ready()
-            if attempt == 0:
-                time.sleep(0.1)
-                continue
-            raise
-    return 0
+    _ensure_cache_db_once()
+    with _cache_transaction() as cur:
+        cur.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+        deleted = cur.rowcount
+    return deleted
+
+
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+def _normalize_ids(value: Any) -> list[str]:
+    """Coerce a scalar or collection of identifiers into a list of non-empty stripped strings."""
+    if value is None:
+        return []
+    if isinstance(value, (str, int, float, bool)):
+        value = (value,)
+    elif not isinstance(value, (list, tuple, set)):
+        return []
+    return list(filter(None, (str(item).strip() for item in value)))
+
+
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+@_with_db_retry
+def _cache_index_update_sync(
+    key: str,
+    add_list: list[str],
+    remove_list: list[str],
+    replace_list: list[str] | None,
+    ttl_seconds: int,
+) -> tuple[list[str], bool]:
+    """Merge identifiers into a cached index list within a single transaction."""
+    _ensure_cache_db_once()
+    now = time.time_ns() // 1_000_000_000
+    with _cache_transaction() as cur:
+        # Insertion-ordered dict keys give order-preserving dedup for free.
+        entries: dict[str, None] = {}
+        changed = False
+
+        if replace_list is not None:
+            entries = dict.fromkeys(replace_list)
+            changed = True
+        else:
+            cur.execute(_SQL_SELECT_ENTRY, (key,))
+            row = cur.fetchone()
+            if row and row["expires_at"] > now and row["value"]:
+                try:
+                    parsed = orjson.loads(row["value"])
+                    if isinstance(parsed, list):
+                        entries = dict.fromkeys(filter(None, (str(item).strip() for item in parsed)))
+                except orjson.JSONDecodeError:
+                    entries = {}
+
+        size = len(entries)
+        entries.update(dict.fromkeys(add_list))
+        if len(entries) != size:
+            changed = True
+
+        size = len(entries)
+        for value in remove_list:
+            entries.pop(value, None)
+        if len(entries) != size:
+            changed = True
+
+        ids = list(entries)
+        cur.execute(_SQL_UPSERT_ENTRY, (key, orjson.dumps(ids), now + ttl_seconds))
+    return ids, changed
 
 
 async def _cache_prepare_db(force: bool = False) -> bool:
@@ -221,12 +309,12 @@ async def _cache_prepare_db(force: bool = False) -> bool:
     return await asyncio.to_thread(_cache_prepare_db_sync, force)
 
 
-async def _cache_get(key: str) -> str | None:
+async def _cache_get(key: str) -> bytes | str | None:
     """Retrieve the cached value for a key if it exists and has not expired."""
     return await asyncio.to_thread(_cache_get_sync, key)
 
 
-async def _cache_set(key: str, value: str, ttl_seconds: int) -> bool:
+async def _cache_set(key: str, value: bytes, ttl_seconds: int) -> bool:
     """Persist a cache entry with the provided TTL."""
     return await asyncio.to_thread(_cache_set_sync, key, value, ttl_seconds)
 
@@ -236,6 +324,17 @@ async def _cache_delete(key: str) -> int:
     return await asyncio.to_thread(_cache_delete_sync, key)
 
 
+async def _cache_index_update(
+    key: str,
+    add_list: list[str],
+    remove_list: list[str],
+    replace_list: list[str] | None,
+    ttl_seconds: int,
+) -> tuple[list[str], bool]:
+    """Atomically merge identifiers into a cached index list."""
+    return await asyncio.to_thread(_cache_index_update_sync, key, add_list, remove_list, replace_list, ttl_seconds)
+
+
 async def _prune_expired() -> int:
     """Async wrapper for pruning expired cache entries."""
     return await asyncio.to_thread(_prune_expired_sync)
@@ -385,7 +484,7 @@ async def memory_cache_set(
     except (ValueError, TypeError):
         ttl = TTL
     try:
-        stored_value = orjson.dumps(value).decode("utf-8")
+        stored_value = orjson.dumps(value)
         async with _acquire_index_lock(key):
             success = await _cache_set(key, stored_value, ttl)
         if not success:
@@ -464,27 +563,9 @@ async def memory_cache_index_update(
             "error": "Missing a required argument: index_key",
         }
 
-    def _normalize(_value: Any) -> list[str]:
-        if _value is None:
-            return []
-        if isinstance(_value, (str, int, float, bool)):
-            seq = [_value]
-        elif isinstance(_value, list):
-            seq = _value
-        elif isinstance(_value, (tuple, set)):
-            seq = list(_value)
-        else:
-            return []
-        result: list[str] = []
-        for _item in seq:
-            normalized = str(_item).strip()
-            if normalized:
-                result.append(normalized)
-        return result
-
-    replace_list = _normalize(replace) if replace is not None else None
-    add_list = _normalize(add)
-    remove_list = _normalize(remove)
+    replace_list = _normalize_ids(replace) if replace is not None else None
+    add_list = _normalize_ids(add)
+    remove_list = _normalize_ids(remove)
 
     if replace_list is None and not add_list and not remove_list:
         return {
@@ -501,54 +582,7 @@ async def memory_cache_index_update(
 
     async with _acquire_index_lock(cleaned_key):
         try:
-            entries: list[str] = []
-            seen: set[str] = set()
-            changed = False
-
-            if replace_list is not None:
-                for value in replace_list:
-                    if value not in seen:
-                        entries.append(value)
-                        seen.add(value)
-                changed = True
-            else:
-                existing_raw = await _cache_get(cleaned_key)
-                if existing_raw:
-                    try:
-                        parsed = orjson.loads(existing_raw)
-                        if isinstance(parsed, list):
-                            for item in parsed:
-                                value = str(item).strip()
-                                if value and value not in seen:
-                                    entries.append(value)
-                                    seen.add(value)
-                    except orjson.JSONDecodeError:
-                        entries = []
-
-            for value in add_list:
-                if value not in seen:
-                    entries.append(value)
-                    seen.add(value)
-                    changed = True
-
-            if remove_list:
-                remove_set = set(remove_list)
-                filtered = [entry for entry in entries if entry not in remove_set]
-                if len(filtered) != len(entries):
-                    entries = filtered
-                    changed = True
-
-            stored_value = orjson.dumps(entries).decode("utf-8")
-            success = await _cache_set(cleaned_key, stored_value, ttl)
-
-            if not success:
-                return {
-                    "status": "error",
-                    "op": "index_update",
-                    "key": cleaned_key,
-                    "error": "cache_set returned False",
-                }
-
+            entries, changed = await _cache_index_update(cleaned_key, add_list, remove_list, replace_list, ttl)
             return {
                 "status": "ok",
                 "op": "index_update",
@@ -6,62 +6,69 @@ Astronomical algorithms
 from the book "Astronomical Algorithms" by Jean Meeus, 1998
 """
 
+import calendar
 import datetime
+import functools
 import math
+import sys
+import time
 from typing import Any
 
+_DR = math.pi / 180.0
+_TWO_PI = math.pi * 2
+
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
 def jd_from_date(dd: int, mm: int, yy: int) -> int:
     """Compute the Julian day number for a given Gregorian date."""
-    a = int((14 - mm) / 12.0)
+    a = (14 - mm) // 12
     y = yy + 4800 - a
     m = mm + 12 * a - 3
-    jd = dd + int((153 * m + 2) / 5.0) + 365 * y + int(y / 4.0) - int(y / 100.0) + int(y / 400.0) - 32045
-    if jd < 2299161:
-        jd = dd + int((153 * m + 2) / 5.0) + 365 * y + int(y / 4.0) - 32083
-    return jd
+    base = dd + (153 * m + 2) // 5 + 365 * y + y // 4
+    jd = base - y // 100 + y // 400 - 32045
+    return jd if jd >= 2299161 else base - 32083
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
-def jd_to_date(jd: int) -> list[int]:
-    """Convert a Julian day number to a Gregorian date [day, month, year]."""
+def jd_to_date(jd: int) -> tuple[int, int, int]:
+    """Convert a Julian day number to a Gregorian date (day, month, year)."""
     if jd > 2299160:
         a = jd + 32044
-        b = int((4 * a + 3) / 146097.0)
-        c = a - int((b * 146097) / 4.0)
+        b = (4 * a + 3) // 146097
+        c = a - (b * 146097) // 4
     else:
         b = 0
         c = jd + 32082
 
-    d = int((4 * c + 3) / 1461.0)
-    e = c - int((1461 * d) / 4.0)
-    m = int((5 * e + 2) / 153.0)
-    day = e - int((153 * m + 2) / 5.0) + 1
-    month = m + 3 - 12 * int(m / 10.0)
-    year = b * 100 + d - 4800 + int(m / 10.0)
-    return [day, month, year]
+    d = (4 * c + 3) // 1461
+    e = c - (1461 * d) // 4
+    m = (5 * e + 2) // 153
+    day = e - (153 * m + 2) // 5 + 1
+    month = m + 3 - 12 * (m // 10)
+    year = b * 100 + d - 4800 + m // 10
+    return day, month, year
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+@functools.lru_cache(maxsize=4096)
 def new_moon(k: int) -> float:
     """Compute the Julian date of the k-th new moon since 1900-01-01."""
+    sin = math.sin
     t = k / 1236.85
     t2 = t * t
     t3 = t2 * t
-    dr = math.pi / 180.0
     jd1 = 2415020.75933 + 29.53058868 * k + 0.0001178 * t2 - 0.000000155 * t3
-    jd1 = jd1 + 0.00033 * math.sin((166.56 + 132.87 * t - 0.009173 * t2) * dr)
-    m = 359.2242 + 29.10535608 * k - 0.0000333 * t2 - 0.00000347 * t3
-    mpr = 306.0253 + 385.81691806 * k + 0.0107306 * t2 + 0.00001236 * t3
-    f = 21.2964 + 390.67050646 * k - 0.0016528 * t2 - 0.00000239 * t3
-    c1 = (0.1734 - 0.000393 * t) * math.sin(m * dr) + 0.0021 * math.sin(2 * dr * m)
-    c1 = c1 - 0.4068 * math.sin(mpr * dr) + 0.0161 * math.sin(dr * 2 * mpr)
-    c1 = c1 - 0.0004 * math.sin(dr * 3 * mpr)
-    c1 = c1 + 0.0104 * math.sin(dr * 2 * f) - 0.0051 * math.sin(dr * (m + mpr))
-    c1 = c1 - 0.0074 * math.sin(dr * (m - mpr)) + 0.0004 * math.sin(dr * (2 * f + m))
-    c1 = c1 - 0.0004 * math.sin(dr * (2 * f - m)) - 0.0006 * math.sin(dr * (2 * f + mpr))
-    c1 = c1 + 0.0010 * math.sin(dr * (2 * f - mpr)) + 0.0005 * math.sin(dr * (2 * mpr + m))
+    jd1 = jd1 + 0.00033 * sin((166.56 + 132.87 * t - 0.009173 * t2) * _DR)
+    m = (359.2242 + 29.10535608 * k - 0.0000333 * t2 - 0.00000347 * t3) * _DR
+    mpr = (306.0253 + 385.81691806 * k + 0.0107306 * t2 + 0.00001236 * t3) * _DR
+    f2 = 2 * (21.2964 + 390.67050646 * k - 0.0016528 * t2 - 0.00000239 * t3) * _DR
+    c1 = (0.1734 - 0.000393 * t) * sin(m) + 0.0021 * sin(2 * m)
+    c1 = c1 - 0.4068 * sin(mpr) + 0.0161 * sin(2 * mpr)
+    c1 = c1 - 0.0004 * sin(3 * mpr)
+    c1 = c1 + 0.0104 * sin(f2) - 0.0051 * sin(m + mpr)
+    c1 = c1 - 0.0074 * sin(m - mpr) + 0.0004 * sin(f2 + m)
+    c1 = c1 - 0.0004 * sin(f2 - m) - 0.0006 * sin(f2 + mpr)
+    c1 = c1 + 0.0010 * sin(f2 - mpr) + 0.0005 * sin(2 * mpr + m)
     if t < -11:
         deltat = 0.001 + 0.000839 * t + 0.0002261 * t2 - 0.00000845 * t3 - 0.000000081 * t * t3
     else:
@@ -73,20 +80,20 @@ def new_moon(k: int) -> float:
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
 def sun_longitude(jdn: float) -> float:
     """Compute the true longitude of the sun for a given Julian date."""
+    sin = math.sin
     t = (jdn - 2451545.0) / 36525.0
     t2 = t * t
-    dr = math.pi / 180.0
-    m = 357.52910 + 35999.05030 * t - 0.0001559 * t2 - 0.00000048 * t * t2
+    m = (357.52910 + 35999.05030 * t - 0.0001559 * t2 - 0.00000048 * t * t2) * _DR
     l0 = 280.46645 + 36000.76983 * t + 0.0003032 * t2
-    dl = (1.914600 - 0.004817 * t - 0.000014 * t2) * math.sin(dr * m)
-    dl += (0.019993 - 0.000101 * t) * math.sin(dr * 2 * m) + 0.000290 * math.sin(dr * 3 * m)
-    longitude = l0 + dl
-    longitude = longitude * dr
-    longitude = longitude - math.pi * 2 * (int(longitude / (math.pi * 2)))
+    dl = (1.914600 - 0.004817 * t - 0.000014 * t2) * sin(m)
+    dl += (0.019993 - 0.000101 * t) * sin(2 * m) + 0.000290 * sin(3 * m)
+    longitude = (l0 + dl) * _DR
+    longitude = longitude - _TWO_PI * (int(longitude / _TWO_PI))
     return longitude
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+@functools.lru_cache(maxsize=4096)
 def get_sun_longitude(day_number: int, time_zone: int) -> int:
     """Compute the solar term index (0-11) for midnight of a given Julian day."""
     return int(sun_longitude(day_number - 0.5 - time_zone / 24.0) / math.pi * 6)
@@ -99,6 +106,7 @@ def get_new_moon_day(k: int, time_zone: int) -> int:
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+@functools.lru_cache(maxsize=4096)
 def get_lunar_month_11(yy: int, time_zone: int) -> int:
     """Find the start of the 11th lunar month for a given Gregorian year."""
     off = jd_from_date(31, 12, yy) - 2415021.0
@@ -111,6 +119,7 @@ def get_lunar_month_11(yy: int, time_zone: int) -> int:
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+@functools.lru_cache(maxsize=4096)
 def get_leap_month_offset(a11: int, time_zone: int) -> int:
     """Calculate the index of the leap month following the 11th lunar month."""
     k = int((a11 - 2415021.076998695) / 29.530588853 + 0.5)
@@ -126,7 +135,7 @@ def get_leap_month_offset(a11: int, time_zone: int) -> int:
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
-def solar_to_lunar(dd: int, mm: int, yy: int, time_zone: int = 7) -> list[int]:
+def solar_to_lunar(dd: int, mm: int, yy: int, time_zone: int = 7) -> tuple[int, int, int, int, int]:
     """Convert a Gregorian (Solar) date to its corresponding Lunar date."""
     day_number = jd_from_date(dd, mm, yy)
     k = int((day_number - 2415021.076998695) / 29.530588853)
@@ -142,7 +151,7 @@ def solar_to_lunar(dd: int, mm: int, yy: int, time_zone: int = 7) -> list[int]:
         lunar_year = yy + 1
         b11 = get_lunar_month_11(yy + 1, time_zone)
     lunar_day = day_number - month_start + 1
-    diff = int((month_start - a11) / 29.0)
+    diff = (month_start - a11) // 29
     lunar_leap = 0
     lunar_month = diff + 11
     if b11 - a11 > 365:
@@ -155,7 +164,7 @@ def solar_to_lunar(dd: int, mm: int, yy: int, time_zone: int = 7) -> list[int]:
         lunar_month = lunar_month - 12
     if lunar_month >= 11 and diff < 4:
         lunar_year -= 1
-    return [lunar_day, lunar_month, lunar_year, lunar_leap, day_number]
+    return lunar_day, lunar_month, lunar_year, lunar_leap, day_number
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
@@ -165,8 +174,8 @@ def lunar_to_solar(
     lunar_year: int,
     lunar_leap: int,
     time_zone: int = 7,
-) -> list[int]:
-    """Convert a Lunar date to its corresponding Gregorian (Solar) date."""
+) -> tuple[int, int, int, int]:
+    """Convert a Lunar date to its corresponding Gregorian (Solar) date and Julian day."""
     if lunar_month < 11:
         a11 = get_lunar_month_11(lunar_year - 1, time_zone)
         b11 = get_lunar_month_11(lunar_year, time_zone)
@@ -183,11 +192,11 @@ def lunar_to_solar(
         if leap_month < 0:
             leap_month += 12
         if lunar_leap != 0 and lunar_month != leap_month:
-            return [0, 0, 0]
+            return 0, 0, 0, 0
         elif lunar_leap != 0 or off >= leap_off:
             off += 1
-    month_start = get_new_moon_day(k + off, time_zone)
-    return jd_to_date(month_start + lunar_day - 1)
+    day_number = get_new_moon_day(k + off, time_zone) + lunar_day - 1
+    return *jd_to_date(day_number), day_number
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
@@ -234,13 +243,17 @@ CHI = [
     "Hợi",
 ]
 
+# Chu kỳ 60 "Can Chi" (Lục thập hoa giáp), index 0 = Giáp Tý
+CAN_CHI = [f"{CAN[i % 10]} {CHI[i % 12]}" for i in range(60)]
+
+# Bit 11 (MSB) = giờ Tý ... bit 0 = giờ Hợi
 AUSPICIOUS_HOURS = [
-    "110100101100",
-    "001101001011",
-    "110011010010",
-    "101100110100",
-    "001011001101",
-    "010010110011",
+    0b110100101100,
+    0b001101001011,
+    0b110011010010,
+    0b101100110100,
+    0b001011001101,
+    0b010010110011,
 ]
 
 SOLAR_TERM = [
@@ -270,20 +283,30 @@ SOLAR_TERM = [
     "Kinh Trập",
 ]
 
+# Chi của tháng tiết khí tương ứng với từng tiết khí (index theo SOLAR_TERM)
+SOLAR_TERM_MONTH_CHI = bytes([3, 4, 4, 5, 5, 6, 6, 7, 7, 8, 8, 9, 9, 10, 10, 11, 11, 0, 0, 1, 1, 2, 2, 3])
+
 # Tý=0, Sửu=1, Dần=2, Mão=3, Thìn=4, Tỵ=5, Ngọ=6, Mùi=7, Thân=8, Dậu=9, Tuất=10, Hợi=11
-AUSPICIOUS_DAY_START_CHI = {
-    (1, 7): 0,  # Tháng 1, 7 (Dần, Thân) -> Bắt đầu từ Tý (index 0)
-    (2, 8): 2,  # Tháng 2, 8 (Mão, Dậu)  -> Bắt đầu từ Dần (index 2)
-    (3, 9): 4,  # Tháng 3, 9 (Thìn, Tuất) -> Bắt đầu từ Thìn (index 4)
-    (4, 10): 6,  # Tháng 4, 10 (Tỵ, Hợi)  -> Bắt đầu từ Ngọ (index 6)
-    (5, 11): 8,  # Tháng 5, 11 (Ngọ, Tý)  -> Bắt đầu từ Thân (index 8)
-    (6, 12): 10,  # Tháng 6, 12 (Mùi, Sửu)  -> Bắt đầu từ Tuất (index 10)
-}
+# Chi bắt đầu chu kỳ theo tháng âm lịch (index = tháng - 1)
+# Tháng 1, 7 -> Tý (0); 2, 8 -> Dần (2); 3, 9 -> Thìn (4); 4, 10 -> Ngọ (6); 5, 11 -> Thân (8); 6, 12 -> Tuất (10)
+AUSPICIOUS_DAY_START_CHI = (0, 2, 4, 6, 8, 10, 0, 2, 4, 6, 8, 10)
 # Các sao trong chu kỳ Hoàng Đạo / Hắc Đạo
 # T: Hoàng Đạo (Tốt), X: Hắc Đạo (Xấu), B: Trung bình (Không tốt không xấu)
 # Thanh Long (T), Minh Đường (T), Thiên Hình (B), Chu Tước (X), Kim Quỹ (B), Kim Đường (T),
 # Bạch Hổ (X), Ngọc Đường (T), Thiên Lao (B), Nguyên Vũ (X), Tư Mệnh (B), Câu Trận (X)
 AUSPICIOUS_DAY_STATUS = ["T", "T", "B", "X", "B", "T", "X", "T", "B", "X", "B", "X"]
+AUSPICIOUS_DAY_RESULTS = {
+    "T": {"day_type": "hoang_dao", "name": "Ngày Hoàng Đạo"},
+    "X": {"day_type": "hac_dao", "name": "Ngày Hắc Đạo"},
+    "B": {"day_type": "neutral", "name": "Ngày trung bình (Không tốt không xấu)"},
+}
+AUSPICIOUS_DAY_UNKNOWN = {"day_type": "unknown", "name": "Không xác định"}
+# Bảng tra cứu theo (tháng âm lịch - 1) * 12 + chi của ngày
+AUSPICIOUS_DAY_TABLE = [
+    AUSPICIOUS_DAY_RESULTS[AUSPICIOUS_DAY_STATUS[(chi - AUSPICIOUS_DAY_START_CHI[month]) % 12]]
+    for month in range(12)
+    for chi in range(12)
+]
 
 # ==============================================================================
 # DỮ LIỆU NHỊ THẬP BÁT TÚ
@@ -830,6 +853,24 @@ TWELVE_DAY_OFFICERS = [
     },
 ]
 
+
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+def freeze_table(table: list[dict[str, Any]]) -> tuple[dict[str, Any], ...]:
+    """Intern every string in a constant table and freeze its lists into tuples."""
+    return tuple(
+        {
+            sys.intern(key): sys.intern(value) if isinstance(value, str) else tuple(sys.intern(item) for item in value)
+            for key, value in entry.items()
+        }
+        for entry in table
+    )
+
+
+TWENTY_EIGHT_MANSIONS = freeze_table(TWENTY_EIGHT_MANSIONS)
+# JD 2451545 (2000-01-01) ứng với sao index 16 (Vị Thổ Trĩ)
+MANSION_JD_OFFSET = (16 - 2451545) % 28
+TWELVE_DAY_OFFICERS = freeze_table(TWELVE_DAY_OFFICERS)
+
 FIELD_MAPPING = {
     "weekday_vi": "Thứ (tiếng Việt)",
     "relative_to": "Ngày Dương lịch mốc để so sánh (luôn là ngày hiện tại)",
@@ -847,22 +888,28 @@ FIELD_MAPPING = {
     "nen_tranh": "Nên tránh",
 }
 
-
-def validate_date(date: str) -> bool:
-    """Validate if a string is in YYYY-MM-DD format."""
-    try:
-        datetime.date.fromisoformat(date)
-        return True
-    except ValueError:
-        return False
+# Các trường cố định, dùng chung cho mọi phản hồi
+STATIC_RESPONSE_FIELDS = {
+    "locale": "vi-VN",
+    "timezone": "Asia/Ho_Chi_Minh",
+    "field_mapping": FIELD_MAPPING,
+}
 
 
-def split_date(date: str) -> tuple[int, int, int]:
-    """Split a date string (YYYY-MM-DD) into day, month, and year."""
-    current_date = datetime.date.fromisoformat(date)
-    return current_date.day, current_date.month, current_date.year
+def parse_date(date: str) -> tuple[int, int, int] | None:
+    """Parse a YYYY-MM-DD string into day, month, and year, or None if invalid."""
+    if len(date) != 10 or date[4] != "-" or date[7] != "-":
+        return None
+    digits = date[:4] + date[5:7] + date[8:]
+    if not (digits.isascii() and digits.isdigit()):
+        return None
+    year, month, day = int(date[:4]), int(date[5:7]), int(date[8:])
+    if year < 1 or not 1 <= month <= 12 or not 1 <= day <= calendar.monthrange(year, month)[1]:
+        return None
+    return day, month, year
 
 
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
 def join_date(day: int, month: int, year: int) -> str:
     """Combine day, month, and year into a YYYY-MM-DD string."""
     return datetime.date(year, month, day).isoformat()
@@ -886,90 +933,43 @@ def split_lunar_date(date: str) -> tuple[int, int, int]:
     return int(parts[2]), int(parts[1]), int(parts[0])
 
 
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+@functools.lru_cache(maxsize=8192)
 def get_day_of_week(day: int, month: int, year: int) -> int:
     """Get the ISO weekday (0=Monday, 6=Sunday) for a date."""
     return datetime.date(year, month, day).weekday()
 
 
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+@functools.lru_cache(maxsize=4096)
 def get_twelve_day_officers(jd: int) -> dict[str, Any]:
     """Calculate the Twelve Day Officer (Trực) for a Julian day."""
-    st_index = get_solar_term(jd, 7)
-    month_chi_list = [
-        3,
-        4,
-        4,
-        5,
-        5,
-        6,
-        6,
-        7,
-        7,
-        8,
-        8,
-        9,
-        9,
-        10,
-        10,
-        11,
-        11,
-        0,
-        0,
-        1,
-        1,
-        2,
-        2,
-        3,
-    ]
-    month_chi_index = month_chi_list[st_index]
+    month_chi_index = SOLAR_TERM_MONTH_CHI[get_solar_term(jd, 7)]
     day_chi_index = (jd + 1) % 12
     duty_index = (day_chi_index - month_chi_index) % 12
 
     return TWELVE_DAY_OFFICERS[duty_index]
 
 
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
 def get_twenty_eight_mansions(jd: int) -> dict[str, Any]:
     """Calculate the Twenty-Eight Mansion (Nhị Thập Bát Tú) for a Julian day."""
-    jd_ref = 2451545
-    mansion_ref_index = 16
-    day_diff = jd - jd_ref
-    current_mansion_index = (mansion_ref_index + day_diff) % 28
-
-    return TWENTY_EIGHT_MANSIONS[current_mansion_index]
+    return TWENTY_EIGHT_MANSIONS[(jd + MANSION_JD_OFFSET) % 28]
 
 
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
 def get_auspicious_day(lunar_month: int, jd: int) -> dict[str, Any]:
     """Determine if a day is auspicious (Hoàng Đạo) or inauspicious (Hắc Đạo)."""
-    chi_of_day_index = (jd + 1) % 12
-    start_chi_index = -1
-    for months, start_index in AUSPICIOUS_DAY_START_CHI.items():
-        if lunar_month in months:
-            start_chi_index = start_index
-            break
-
-    if start_chi_index == -1:
-        return {"day_type": "unknown", "name": "Không xác định"}
+    if not 1 <= lunar_month <= 12:
+        return AUSPICIOUS_DAY_UNKNOWN
+    return AUSPICIOUS_DAY_TABLE[(lunar_month - 1) * 12 + (jd + 1) % 12]
 
-    offset = (chi_of_day_index - start_chi_index) % 12
-
-    if AUSPICIOUS_DAY_STATUS[offset] == "T":
-        return {"day_type": "hoang_dao", "name": "Ngày Hoàng Đạo"}
-    elif AUSPICIOUS_DAY_STATUS[offset] == "X":
-        return {"day_type": "hac_dao", "name": "Ngày Hắc Đạo"}
-    elif AUSPICIOUS_DAY_STATUS[offset] == "B":
-        return {
-            "day_type": "neutral",
-            "name": "Ngày trung bình (Không tốt không xấu)",
-        }
-    return {"day_type": "unknown", "name": "Không xác định"}
 
-
-def get_auspicious_hours(jd: int) -> list:
-    """Calculate auspicious hours for a given Julian day based on its earthly branch."""
-    chi_of_day = (jd + 1) % 12
-    auspicious_hours_pattern = AUSPICIOUS_HOURS[chi_of_day % 6]
+def build_auspicious_hours(auspicious_hours_pattern: int) -> list:
+    """Expand an auspicious hour bit mask into the list of hour entries."""
     auspicious_hours = []
     for i in range(12):
-        if auspicious_hours_pattern[i] == "1":
+        if (auspicious_hours_pattern >> (11 - i)) & 1:
             hour_name = CHI[i]
             start_hour = (i * 2 + 23) % 24
             end_hour = (i * 2 + 1) % 24
@@ -987,11 +987,95 @@ def get_auspicious_hours(jd: int) -> list:
     return auspicious_hours
 
 
-def get_number_of_days(date: str) -> int:
-    """Calculate the day difference between today and a given date string."""
-    start_date = datetime.datetime.combine(datetime.date.today(), datetime.time.min)
-    end_date = datetime.datetime.strptime(date, "%Y-%m-%d")
-    return (end_date - start_date).days
+AUSPICIOUS_HOURS_SCHEDULE = [build_auspicious_hours(pattern) for pattern in AUSPICIOUS_HOURS]
+
+
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+def get_auspicious_hours(jd: int) -> list:
+    """Calculate auspicious hours for a given Julian day based on its earthly branch."""
+    return AUSPICIOUS_HOURS_SCHEDULE[(jd + 1) % 12 % 6]
+
+
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+@functools.lru_cache(maxsize=1)
+def get_today(minute: int) -> datetime.date:
+    """Return today's date, shared by all calls within the same wall-clock minute."""
+    return datetime.date.today()
+
+
+def get_number_of_days(day: int, month: int, year: int, today: datetime.date) -> int:
+    """Calculate the day difference between today and a given date."""
+    return (datetime.date(year, month, day) - today).days
+
+
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+def build_response(
+    conversion_type: str,
+    solar_date: tuple[int, int, int],
+    lunar_date: tuple[int, int, int],
+    leap_month: bool,
+    jd: int,
+) -> dict[str, Any]:
+    """Assemble the service response for a converted (day, month, year) solar/lunar date pair."""
+    solar_day, solar_month, solar_year = solar_date
+    lunar_day, lunar_month, lunar_year = lunar_date
+    can_chi_day = CAN_CHI[(jd + 49) % 60]
+    can_chi_month = CAN_CHI[(lunar_year * 12 + lunar_month + 13) % 60]
+    can_chi_year = CAN_CHI[(lunar_year + 56) % 60]
+    weekday = DAYS[get_day_of_week(solar_day, solar_month, solar_year)]
+    if conversion_type == "s2l":
+        lunar_month_name = MONTHS[lunar_month - 1] + (" nhuận" if leap_month else "")
+        full_date_key = "full_lunar_date_vi"
+        full_date_vi = f"{weekday} ngày {lunar_day} tháng {lunar_month_name} năm {can_chi_year}"
+        calendar_type = "lunar"
+    else:
+        full_date_key = "full_solar_date_vi"
+        full_date_vi = f"{weekday} ngày {solar_day} tháng {solar_month} năm {solar_year}"
+        calendar_type = "solar"
+    return {
+        "mode": conversion_type,
+        "solar_date": join_date(solar_day, solar_month, solar_year),
+        "lunar_date": f"{lunar_year:04d}-{lunar_month:02d}-{lunar_day:02d}",
+        "weekday_vi": weekday,
+        # Phụ thuộc ngày hiện tại, được điền lại ở mỗi lần gọi
+        "difference_days": None,
+        "difference_direction": None,
+        "relative_to": None,
+        "lunar_date_meta": {"leap_month": leap_month},
+        full_date_key: full_date_vi,
+        "can_chi": {
+            "calendar": calendar_type,
+            "full_can_chi_date_vi": f"{weekday} ngày {can_chi_day} tháng {can_chi_month} năm {can_chi_year}",
+        },
+        "solar_term": SOLAR_TERM[get_solar_term(jd + 1, 7)],
+        "extras": {
+            "auspicious_hours": get_auspicious_hours(jd),
+            "auspicious_day": get_auspicious_day(lunar_month, jd),
+            "twelve_day_officers": get_twelve_day_officers(jd),
+            "twenty_eight_mansions": get_twenty_eight_mansions(jd),
+        },
+        **STATIC_RESPONSE_FIELDS,
+    }
+
+
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+@functools.lru_cache(maxsize=256)
+def convert_date(
+    conversion_type: str, day: int, month: int, year: int, leap_month: bool
+) -> tuple[tuple[int, int, int] | None, dict[str, Any]]:
+    """Convert a parsed date and build its response, returning (solar date, response) or (None, error)."""
+    if conversion_type == "s2l":
+        lunar_date = solar_to_lunar(day, month, year)
+        return (day, month, year), build_response(
+            "s2l", (day, month, year), lunar_date[:3], lunar_date[3] == 1, lunar_date[4]
+        )
+    solar_date = lunar_to_solar(day, month, year, 1 if leap_month else 0)
+    if solar_date == (0, 0, 0, 0):
+        return None, {
+            "error": f"Invalid lunar date: Day {day} Month {month} (Leap: {leap_month}) Year {year} does not exist."
+        }
+    solar_ymd = solar_date[:3]
+    return solar_ymd, build_response("l2s", solar_ymd, (day, month, year), leap_month, solar_date[3])
 
 
 @service(supports_response="only")  # noqa: F821  # ty:ignore[unresolved-reference]
@@ -1033,114 +1117,33 @@ def date_conversion_tool(conversion_type: str, date: str, **kwargs) -> dict[str,
     if conversion_type not in ["s2l", "l2s"]:
         return {"error": "Wrong Conversion Type: conversion_type must be s2l or l2s"}
 
+    today = get_today(int(time.time()) // 60)
     if conversion_type == "l2s":
         if not validate_lunar_date(date):
             return {"error": "Invalid date format: YYYY-MM-DD (day 1-30, month 1-12)"}
         day, month, year = split_lunar_date(date)
     else:
-        if not validate_date(date):
+        parsed_date = parse_date(date)
+        if parsed_date is None:
             return {"error": "Invalid date format: YYYY-MM-DD"}
-        day, month, year = split_date(date)
-    if conversion_type == "s2l":
-        try:
-            response = {}
-            lunar_date = solar_to_lunar(day, month, year)
-            days = get_number_of_days(date)
-            lunar_month = MONTHS[lunar_date[1] - 1] + (" nhuận" if lunar_date[3] == 1 else "")
-            can_chi_day = CAN[(lunar_date[4] + 9) % 10] + " " + CHI[(lunar_date[4] + 1) % 12]
-            can_chi_month = CAN[(lunar_date[2] * 12 + lunar_date[1] + 3) % 10] + " " + CHI[(lunar_date[1] + 1) % 12]
-            can_chi_year = CAN[(lunar_date[2] + 6) % 10] + " " + CHI[(lunar_date[2] + 8) % 12]
-            auspicious_hours = get_auspicious_hours(lunar_date[4])
-            auspicious_day = get_auspicious_day(lunar_date[1], lunar_date[4])
-            twelve_day_officers = get_twelve_day_officers(lunar_date[4])
-            twenty_eight_mansions = get_twenty_eight_mansions(lunar_date[4])
-            response["mode"] = "s2l"
-            response["solar_date"] = date
-            response["lunar_date"] = f"{lunar_date[2]:04d}-{lunar_date[1]:02d}-{lunar_date[0]:02d}"
-            response["weekday_vi"] = f"{DAYS[get_day_of_week(day, month, year)]}"
-            response["difference_days"] = abs(days)
-            response["difference_direction"] = "days_remaining" if days >= 0 else "days_elapsed"
-            response["relative_to"] = datetime.date.today().isoformat()
-            response["lunar_date_meta"] = {"leap_month": lunar_date[3] == 1}
-            response["full_lunar_date_vi"] = (
-                f"{DAYS[get_day_of_week(day, month, year)]} ngày {lunar_date[0]} tháng {lunar_month} năm {can_chi_year}"
-            )
-            response["can_chi"] = {
-                "calendar": "lunar",
-                "full_can_chi_date_vi": f"{DAYS[get_day_of_week(day, month, year)]} "
-                f"ngày {can_chi_day} tháng {can_chi_month} năm {can_chi_year}",
-            }
-            response["solar_term"] = SOLAR_TERM[get_solar_term(lunar_date[4] + 1, 7)]
-            response["extras"] = {
-                "auspicious_hours": auspicious_hours,
-                "auspicious_day": auspicious_day,
-                "twelve_day_officers": twelve_day_officers,
-                "twenty_eight_mansions": twenty_eight_mansions,
-            }
-            response["locale"] = "vi-VN"
-            response["timezone"] = "Asia/Ho_Chi_Minh"
-            response["field_mapping"] = FIELD_MAPPING
+        day, month, year = parsed_date
+    if conversion_type == "l2s" and day > 30:
+        return {"error": "Invalid date: Lunar day must be less than or equal to 30"}
 
+    leap_month = conversion_type == "l2s" and bool(kwargs.get("leap_month", False))
+    source, target = ("Solar", "Lunar") if conversion_type == "s2l" else ("Lunar", "Solar")
+    try:
+        solar_date, cached_response = convert_date(conversion_type, day, month, year, leap_month)
+        response = dict(cached_response)
+        if solar_date is None:
             return response
-        except Exception as error:
-            log.error(  # noqa: F821  # ty:ignore[unresolved-reference]
-                f"{__name__}: Solar to Lunar conversion failed for {date}: {error}"
-            )
-            return {"error": f"Error converting Solar date {date} to Lunar date: {error}"}
-    elif conversion_type == "l2s":
-        if day > 30:
-            return {"error": "Invalid date: Lunar day must be less than or equal to 30"}
-        try:
-            response = {}
-            leap_month = bool(kwargs.get("leap_month", False))
-            is_leap = 1 if leap_month else 0
-            solar_date = lunar_to_solar(day, month, year, is_leap)
-            if solar_date == [0, 0, 0]:
-                return {
-                    "error": f"Invalid lunar date: Day {day} Month {month} "
-                    f"(Leap: {leap_month}) Year {year} does not exist."
-                }
-            days = get_number_of_days(join_date(solar_date[0], solar_date[1], solar_date[2]))
-            day_number = jd_from_date(solar_date[0], solar_date[1], solar_date[2])
-            can_chi_day = CAN[(day_number + 9) % 10] + " " + CHI[(day_number + 1) % 12]
-            can_chi_month = CAN[(year * 12 + month + 3) % 10] + " " + CHI[(month + 1) % 12]
-            can_chi_year = CAN[(year + 6) % 10] + " " + CHI[(year + 8) % 12]
-            auspicious_hours = get_auspicious_hours(day_number)
-            auspicious_day = get_auspicious_day(month, day_number)
-            twelve_day_officers = get_twelve_day_officers(day_number)
-            twenty_eight_mansions = get_twenty_eight_mansions(day_number)
-            response["mode"] = "l2s"
-            response["solar_date"] = join_date(solar_date[0], solar_date[1], solar_date[2])
-            response["lunar_date"] = date
-            response["weekday_vi"] = f"{DAYS[get_day_of_week(solar_date[0], solar_date[1], solar_date[2])]}"
-            response["difference_days"] = abs(days)
-            response["difference_direction"] = "days_remaining" if days >= 0 else "days_elapsed"
-            response["relative_to"] = datetime.date.today().isoformat()
-            response["lunar_date_meta"] = {"leap_month": leap_month}
-            response["full_solar_date_vi"] = (
-                f"{DAYS[get_day_of_week(solar_date[0], solar_date[1], solar_date[2])]} "
-                f"ngày {solar_date[0]} tháng {solar_date[1]} năm {solar_date[2]}"
-            )
-            response["can_chi"] = {
-                "calendar": "solar",
-                "full_can_chi_date_vi": f"{DAYS[get_day_of_week(solar_date[0], solar_date[1], solar_date[2])]} "
-                f"ngày {can_chi_day} tháng {can_chi_month} năm {can_chi_year}",
-            }
-            response["solar_term"] = SOLAR_TERM[get_solar_term(day_number + 1, 7)]
-            response["extras"] = {
-                "auspicious_hours": auspicious_hours,
-                "auspicious_day": auspicious_day,
-                "twelve_day_officers": twelve_day_officers,
-                "twenty_eight_mansions": twenty_eight_mansions,
-            }
-            response["locale"] = "vi-VN"
-            response["timezone"] = "Asia/Ho_Chi_Minh"
-            response["field_mapping"] = FIELD_MAPPING
-            return response
-        except Exception as error:
-            log.error(  # noqa: F821  # ty:ignore[unresolved-reference]
-                f"{__name__}: Lunar to Solar conversion failed for {date}: {error}"
-            )
-            return {"error": f"Error converting Lunar date {date} {kwargs} to Solar date: {error}"}
-    else:
-        return {"error": "Failed to convert date"}
+        days = get_number_of_days(solar_date[0], solar_date[1], solar_date[2], today)
+        response["difference_days"] = abs(days)
+        response["difference_direction"] = "days_remaining" if days >= 0 else "days_elapsed"
+        response["relative_to"] = today.isoformat()
+        return response
+    except Exception as error:
+        log.error(  # noqa: F821  # ty:ignore[unresolved-reference]
+            f"{__name__}: {source} to {target} conversion failed for {date}: {error}"
+        )
+        return {"error": f"Error converting {source} date {date} to {target} date: {error}"}
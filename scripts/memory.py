@@ -1,11 +1,16 @@
 import asyncio
+import collections
+import functools
 import re
 import sqlite3
+import sys
 import threading
 import time
 import unicodedata
-from contextlib import closing
-from datetime import UTC, datetime, timedelta
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import suppress
+from datetime import UTC, datetime
 from pathlib import Path
 from typing import Any
 
@@ -16,6 +21,11 @@ SEARCH_LIMIT_MAX = 50
 NEAR_DISTANCE = 5
 CANDIDATE_CHECK_LIMIT = 5
 HOUSEKEEPING_GRACE_DAYS = 10
+SECONDS_PER_DAY = 86400
+SET_BATCH_MAX = 64
+NORMALIZE_CACHE_MAX_CHARS = 256
+FTS_TIE_OVERFETCH = 10
+FTS_BM25_WEIGHTS = (10.0, 1.0, 5.0)  # mem_fts columns: key, value, tags
 HOUSEKEEPING_GRACE_MAX_DAYS = 365
 VALUE_PREVIEW_CHARS = 120
 BM25_WEIGHT = 0.5
@@ -56,8 +66,121 @@ EXTRA_CHAR_REPLACEMENTS = {
     "ü": "u",
 }
 
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]++")
+
+_FTS_TABLE_DDL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS mem_fts USING fts5(
+        key, value, tags,
+        content='mem',
+        content_rowid='id',
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3 4'
+    );
+"""
+# Substring index backing the LIKE-style fallback search.
+_TRIGRAM_TABLE_DDL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS mem_trigram USING fts5(
+        key, value, tags,
+        content='mem',
+        content_rowid='id',
+        tokenize = 'trigram'
+    );
+"""
+_FTS_TRIGGERS_DDL = (
+    """
+    CREATE TRIGGER IF NOT EXISTS mem_ai
+        AFTER INSERT
+        ON mem
+    BEGIN
+        INSERT INTO mem_fts(rowid, key, value, tags)
+        VALUES (new.id,
+                new.key,
+                new.value,
+                new.tags_search);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS mem_ad
+        AFTER DELETE
+        ON mem
+    BEGIN
+        INSERT INTO mem_fts(mem_fts, rowid, key, value, tags)
+        VALUES ('delete', old.id, old.key, old.value, old.tags_search);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS mem_au
+        AFTER UPDATE OF key, value, tags_search
+        ON mem
+        WHEN (old.key IS NOT new.key)
+            OR (old.value IS NOT new.value)
+            OR (old.tags_search IS NOT new.tags_search)
+    BEGIN
+        INSERT INTO mem_fts(mem_fts, rowid, key, value, tags)
+        VALUES ('delete', old.id, old.key, old.value, old.tags_search);
+        INSERT INTO mem_fts(rowid, key, value, tags)
+        VALUES (new.id,
+                new.key,
+                new.value,
+                new.tags_search);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS mem_trigram_ai
+        AFTER INSERT
+        ON mem
+    BEGIN
+        INSERT INTO mem_trigram(rowid, key, value, tags)
+        VALUES (new.id,
+                new.key,
+                new.value,
+                new.tags_search);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS mem_trigram_ad
+        AFTER DELETE
+        ON mem
+    BEGIN
+        INSERT INTO mem_trigram(mem_trigram, rowid, key, value, tags)
+        VALUES ('delete', old.id, old.key, old.value, old.tags_search);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS mem_trigram_au
+        AFTER UPDATE OF key, value, tags_search
+        ON mem
+        WHEN (old.key IS NOT new.key)
+            OR (old.value IS NOT new.value)
+            OR (old.tags_search IS NOT new.tags_search)
+    BEGIN
+        INSERT INTO mem_trigram(mem_trigram, rowid, key, value, tags)
+        VALUES ('delete', old.id, old.key, old.value, old.tags_search);
+        INSERT INTO mem_trigram(rowid, key, value, tags)
+        VALUES (new.id,
+                new.key,
+                new.value,
+                new.tags_search);
+    END;
+    """,
+)
+
+_SearchHit = collections.namedtuple(
+    "_SearchHit",
+    ("key", "value", "scope", "tags", "created_at", "last_used_at", "expires_at", "match_score"),
+)
+
 _DB_READY = False
 _DB_READY_LOCK = threading.Lock()
+_DB_RECHECK_SECONDS = 5.0
+_DB_CHECKED_AT = 0.0
+_DB_GENERATION = 0
+_LAST_ISO: tuple[float, str] = (0.0, "")
+_DB_LOCAL = threading.local()
+# Writes are queued on one thread instead of contending for SQLite's write lock from many workers.
+_DB_WRITER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory_db_writer")
+_PENDING_SETS: list[tuple[tuple[Any, ...], Future[bool]]] = []
+_PENDING_SETS_LOCK = threading.Lock()
 
 result_entity_name: dict[str, str] = {}
 
@@ -79,35 +202,73 @@ def _ensure_result_entity_name(force: bool = False) -> None:
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
 def _utcnow_iso() -> str:
-    """Return current UTC time in ISO 8601 format."""
-    return datetime.now(UTC).isoformat()
+    """Return current UTC time in ISO 8601 format, reusing the last string within the same millisecond."""
+    global _LAST_ISO
+    now = time.time()
+    last_ts, last_iso = _LAST_ISO
+    if 0 <= now - last_ts < 0.001:
+        return last_iso
+    iso = datetime.fromtimestamp(now, UTC).isoformat()
+    _LAST_ISO = (now, iso)
+    return iso
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
-def _dt_from_iso(s: str) -> datetime | None:
-    """Parse an ISO 8601 string into a datetime object."""
-    try:
-        return datetime.fromisoformat(s)
-    except (TypeError, ValueError):
+def _set_timestamps(expiration_days: int) -> tuple[str, int | None]:
+    """Return the timestamps for a new record: now in ISO 8601, and its expiry in unix seconds if it expires."""
+    now = datetime.now(UTC)
+    if not expiration_days:
+        return now.isoformat(), None
+    return now.isoformat(), int(now.timestamp()) + expiration_days * SECONDS_PER_DAY
+
+
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+def _iso_from_ts(ts: int | None) -> str | None:
+    """Format a stored unix-seconds expiry as ISO 8601 for responses."""
+    if ts is None:
         return None
+    return datetime.fromtimestamp(ts, UTC).isoformat()
+
+
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+def _close_db_connection() -> None:
+    """Close and discard the pooled SQLite connection of the current thread."""
+    conn = getattr(_DB_LOCAL, "conn", None)
+    _DB_LOCAL.conn = None
+    if conn is not None:
+        with suppress(sqlite3.Error):
+            conn.close()
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
 def _get_db_connection() -> sqlite3.Connection:
-    """Create a configured SQLite connection with optimized PRAGMAs."""
+    """Return the pooled SQLite connection of the current thread, opening it on first use."""
+    conn = getattr(_DB_LOCAL, "conn", None)
+    if conn is not None and getattr(_DB_LOCAL, "generation", None) == _DB_GENERATION:
+        return conn
+    _close_db_connection()
     conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA synchronous=NORMAL;")
-    conn.execute("PRAGMA temp_store=MEMORY;")
-    conn.execute("PRAGMA busy_timeout=3000;")
+    try:
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute("PRAGMA temp_store=MEMORY;")
+        conn.execute("PRAGMA busy_timeout=3000;")
+    except sqlite3.Error:
+        conn.close()
+        raise
+    _DB_LOCAL.conn = conn
+    _DB_LOCAL.generation = _DB_GENERATION
     return conn
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
 def _ensure_db() -> None:
     """Initialize the database schema and indices."""
+    global _DB_GENERATION
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with closing(_get_db_connection()) as conn:
+    # Invalidate pooled connections so every thread reopens against the (re)created file.
+    _DB_GENERATION += 1
+    with _get_db_connection() as conn:
         conn.execute("PRAGMA journal_mode=WAL;")
         conn.execute(
             """
@@ -121,59 +282,30 @@ def _ensure_db() -> None:
                 tags_search  TEXT        NOT NULL,
                 created_at   TEXT        NOT NULL,
                 last_used_at TEXT        NOT NULL,
-                expires_at   TEXT
-            );
-            """
-        )
-        conn.execute(
-            """
-            CREATE VIRTUAL TABLE IF NOT EXISTS mem_fts USING fts5(
-                key, value, tags,
-                content='mem',
-                content_rowid='id',
-                tokenize = 'unicode61 remove_diacritics 2'
+                expires_ts   INTEGER
             );
             """
         )
+        conn.execute(_FTS_TABLE_DDL)
+        has_trigram = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'mem_trigram'").fetchone()
+        conn.execute(_TRIGRAM_TABLE_DDL)
+        if not has_trigram:
+            conn.execute("INSERT INTO mem_trigram(mem_trigram) VALUES('rebuild')")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_mem_scope ON mem(scope);")
-        conn.executescript(
-            """
-            CREATE TRIGGER IF NOT EXISTS mem_ai
-                AFTER INSERT
-                ON mem
-            BEGIN
-                INSERT INTO mem_fts(rowid, key, value, tags)
-                VALUES (new.id,
-                        new.key,
-                        new.value,
-                        new.tags_search);
-            END;
-
-            CREATE TRIGGER IF NOT EXISTS mem_ad
-                AFTER DELETE
-                ON mem
-            BEGIN
-                INSERT INTO mem_fts(mem_fts, rowid, key, value, tags)
-                VALUES ('delete', old.id, old.key, old.value, old.tags_search);
-            END;
-
-            CREATE TRIGGER IF NOT EXISTS mem_au
-                AFTER UPDATE OF key, value, tags_search
-                ON mem
-                WHEN (old.key IS NOT new.key)
-                    OR (old.value IS NOT new.value)
-                    OR (old.tags_search IS NOT new.tags_search)
-            BEGIN
-                INSERT INTO mem_fts(mem_fts, rowid, key, value, tags)
-                VALUES ('delete', old.id, old.key, old.value, old.tags_search);
-                INSERT INTO mem_fts(rowid, key, value, tags)
-                VALUES (new.id,
-                        new.key,
-                        new.value,
-                        new.tags_search);
-            END;
-            """
-        )
+        columns = {column["name"] for column in conn.execute("PRAGMA table_info(mem);")}
+        if "expires_ts" not in columns:
+            # Migrate ISO-8601 expires_at strings to integer unix seconds.
+            conn.execute("ALTER TABLE mem ADD COLUMN expires_ts INTEGER;")
+            conn.execute(
+                "UPDATE mem SET expires_ts = CAST(strftime('%s', expires_at) AS INTEGER) WHERE expires_at IS NOT NULL;"
+            )
+        if "expires_at" in columns:
+            conn.execute("DROP INDEX IF EXISTS idx_mem_expires_at;")
+            with suppress(sqlite3.OperationalError):
+                conn.execute("ALTER TABLE mem DROP COLUMN expires_at;")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_mem_expires_ts ON mem(expires_ts) WHERE expires_ts IS NOT NULL;")
+        for statement in _FTS_TRIGGERS_DDL:
+            conn.execute(statement)
         conn.execute("PRAGMA optimize;")
         conn.commit()
 
@@ -181,10 +313,15 @@ def _ensure_db() -> None:
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
 def _ensure_db_once(force: bool = False) -> None:
     """Ensure the database is initialized, optionally forcing a rebuild."""
-    global _DB_READY
+    global _DB_READY, _DB_CHECKED_AT
     if force:
         _DB_READY = False
+    now = time.monotonic()
+    # Trust the ready flag between checks; only stat the file every few seconds to notice a removed database.
+    if _DB_READY and now - _DB_CHECKED_AT < _DB_RECHECK_SECONDS:
+        return
     if _DB_READY and DB_PATH.exists():
+        _DB_CHECKED_AT = now
         return
     with _DB_READY_LOCK:
         if force:
@@ -192,6 +329,7 @@ def _ensure_db_once(force: bool = False) -> None:
         if not _DB_READY or not DB_PATH.exists():
             _ensure_db()
             _DB_READY = True
+        _DB_CHECKED_AT = now
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
@@ -199,7 +337,19 @@ def _normalize_value(s: str) -> str:
     """Normalize text value to Unicode NFC form."""
     if s is None:
         return ""
-    return unicodedata.normalize("NFC", str(s))
+    s = str(s)
+    return s if s.isascii() else unicodedata.normalize("NFC", s)
+
+
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+@functools.lru_cache(maxsize=1)
+def _diacritics_table() -> dict[int, str | None]:
+    """Build the translate table that drops combining marks and maps locale-specific characters."""
+    table: dict[int, str | None] = {
+        code: None for code in range(sys.maxunicode + 1) if unicodedata.category(chr(code)) == "Mn"
+    }
+    table.update(str.maketrans(EXTRA_CHAR_REPLACEMENTS))
+    return table
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
@@ -207,18 +357,9 @@ def _strip_diacritics(value: str) -> str:
     """Remove diacritics and normalize locale-specific characters."""
     if value is None:
         return ""
-    decomposed = unicodedata.normalize("NFKD", value)
-    filtered: list[str] = []
-    for ch in decomposed:
-        replacement = EXTRA_CHAR_REPLACEMENTS.get(ch)
-        if replacement is not None:
-            if replacement:
-                filtered.extend(replacement)
-            continue
-        if unicodedata.category(ch) == "Mn":
-            continue
-        filtered.append(ch)
-    return "".join(filtered)
+    if value.isascii():
+        return value
+    return unicodedata.normalize("NFKD", value).translate(_diacritics_table())
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
@@ -226,11 +367,19 @@ def _normalize_search_text(value: str | None) -> str:
     """Normalize text for search indexing and querying."""
     if value is None:
         return ""
-    lowered = str(value).lower()
-    stripped = _strip_diacritics(lowered)
-    cleaned = re.sub(r"[,/_]+", " ", stripped)
-    cleaned = re.sub(r"[^a-z0-9]+", " ", cleaned)
-    return re.sub(r"\s+", " ", cleaned).strip()
+    value = str(value)
+    if len(value) > NORMALIZE_CACHE_MAX_CHARS:
+        return _normalize_search_str.__wrapped__(value)
+    return _normalize_search_str(value)
+
+
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+@functools.lru_cache(maxsize=4096)
+def _normalize_search_str(value: str) -> str:
+    """Normalize a string for search, memoizing repeated tags and queries."""
+    lowered = value.lower()
+    stripped = lowered if lowered.isascii() else _strip_diacritics(lowered)
+    return _NON_ALNUM_RE.sub(" ", stripped).strip()
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
@@ -239,31 +388,47 @@ def _normalize_tags(s: str) -> str:
     return _normalize_search_text(s)
 
 
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+@functools.lru_cache(maxsize=4096)
+def _tag_tokens(tags_search: str) -> frozenset[str]:
+    """Split normalized tags into a token set, memoized by the tag string itself."""
+    return frozenset(tags_search.split())
+
+
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
 def _normalize_key(s: str) -> str:
     """Normalize a memory key to a standard alphanumeric format."""
     if s is None:
         return ""
-    s = str(s).strip().lower()
-    s = _strip_diacritics(s)
-    s = re.sub(r"[^a-z0-9_]", "_", s)
-    s = re.sub(r"_+", "_", s).strip("_")
-    return s
+    s = str(s)
+    if len(s) > NORMALIZE_CACHE_MAX_CHARS:
+        return _normalize_key_str.__wrapped__(s)
+    return _normalize_key_str(s)
 
 
-def _condense_candidate_for_selection(entry: dict[str, Any], *, score: float | None = None) -> dict[str, Any]:
-    """Condense a database entry for inclusion in result lists."""
-    value = entry.get("value")
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+@functools.lru_cache(maxsize=4096)
+def _normalize_key_str(s: str) -> str:
+    """Normalize a key string, memoizing repeated keys."""
+    s = s.strip().lower()
+    if not s.isascii():
+        s = _strip_diacritics(s)
+    return _NON_ALNUM_RE.sub("_", s).strip("_")
+
+
+def _condense_candidate_for_selection(entry: _SearchHit, *, score: float | None = None) -> dict[str, Any]:
+    """Condense a search hit for inclusion in result lists."""
+    value = entry.value
     if isinstance(value, str) and len(value) > VALUE_PREVIEW_CHARS:
         value = value[: VALUE_PREVIEW_CHARS - 3] + "..."
     data = {
-        "key": entry.get("key"),
+        "key": entry.key,
         "value": value,
-        "scope": entry.get("scope"),
-        "tags": entry.get("tags"),
-        "created_at": entry.get("created_at"),
-        "last_used_at": entry.get("last_used_at"),
-        "expires_at": entry.get("expires_at"),
+        "scope": entry.scope,
+        "tags": entry.tags,
+        "created_at": entry.created_at,
+        "last_used_at": entry.last_used_at,
+        "expires_at": entry.expires_at,
     }
     if score is not None:
         data["match_score"] = score
@@ -271,17 +436,17 @@ def _condense_candidate_for_selection(entry: dict[str, Any], *, score: float | N
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
-def _calculate_match_score(source_tokens: set[str], candidate_tokens: set[str], bm25_raw: float | None) -> float:
+def _calculate_match_score(
+    source_tokens: frozenset[str], candidate_tokens: frozenset[str], bm25_raw: float | None
+) -> float:
     """Calculate a combined match score using Jaccard similarity and BM25."""
     if not source_tokens or not candidate_tokens:
         jaccard_score = 0.0
     else:
-        intersection = source_tokens.intersection(candidate_tokens)
-        if not intersection:
+        shared = len(source_tokens & candidate_tokens)
+        if not shared:
             return 0.0
-        union = source_tokens.union(candidate_tokens)
-        union_size = len(union) or 1
-        jaccard_score = len(intersection) / union_size
+        jaccard_score = shared / (len(source_tokens) + len(candidate_tokens) - shared)
     if isinstance(bm25_raw, (int, float)):
         bm25_score = 1 / (1 + max(bm25_raw, 0))
         jaccard_weight = 1 - BM25_WEIGHT
@@ -295,47 +460,36 @@ async def _search_tag_candidates(
     exclude_keys: set[str] | None = None,
     limit: int | None = None,
     log_context: str = "tag lookup",
-) -> list[tuple[dict[str, Any], float]]:
+) -> list[tuple[_SearchHit, float]]:
     """Find memory records with similar tags using normalized token matching."""
     tags_search = _normalize_tags(source or "")
     if not tags_search:
         return []
-    tag_tokens = {token for token in tags_search.split() if token}
-    if not tag_tokens:
-        return []
     limit_value = limit if limit is not None else min(CANDIDATE_CHECK_LIMIT, SEARCH_LIMIT_MAX)
     limit_value = max(1, min(limit_value, SEARCH_LIMIT_MAX))
+    exclude_norm = tuple(sorted({_normalize_key(item) for item in exclude_keys if item})) if exclude_keys else ()
     try:
-        raw_matches = await _memory_search_db(tags_search, limit=limit_value)
+        raw_matches = await _memory_search_db(
+            tags_search,
+            limit=limit_value,
+            exclude_keys=exclude_norm,
+            tags_only=True,
+        )
     except sqlite3.Error as lookup_err:
         log.error(f"memory {log_context} failed for '{tags_search}': {lookup_err}")  # noqa: F821  # ty:ignore[unresolved-reference]
         return []
-    if not raw_matches:
-        return []
-    exclude_norm = {_normalize_key(item) for item in exclude_keys if item} if exclude_keys else set()
-    dedup: dict[str, tuple[dict[str, Any], float]] = {}
-    for item in raw_matches:
-        existing_key = _normalize_key(item.get("key", ""))
-        if not existing_key or existing_key in exclude_norm or existing_key in dedup:
-            continue
-        score_raw = item.get("match_score", "")
-        score_val: float | None
-        if isinstance(score_raw, (int, float)):
-            score_val = float(score_raw)
-        else:
-            try:
-                score_val = float(score_raw)
-            except (TypeError, ValueError):
-                existing_tags_norm = _normalize_tags(item.get("tags", ""))
-                candidate_tokens = {token for token in existing_tags_norm.split() if token}
-                score_val = _calculate_match_score(tag_tokens, candidate_tokens, None)
-        if score_val is None or score_val <= 0:
+    return _rank_tag_candidates(raw_matches, limit_value)
+
+
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+def _rank_tag_candidates(hits: list[_SearchHit], limit: int) -> list[tuple[_SearchHit, float]]:
+    """Keep the first positive-scoring hit per key and order them by score."""
+    dedup: dict[str, tuple[_SearchHit, float]] = {}
+    for hit in hits:
+        if not hit.key or hit.key in dedup or hit.match_score <= 0:
             continue
-        dedup[existing_key] = (item, score_val)
-    if not dedup:
-        return []
-    sorted_candidates = sorted(dedup.values(), key=lambda pair: pair[1], reverse=True)
-    return sorted_candidates[:limit_value]
+        dedup[hit.key] = (hit, hit.match_score)
+    return sorted(dedup.values(), key=lambda pair: pair[1], reverse=True)[:limit]
 
 
 async def _find_tag_matches_for_query(
@@ -368,18 +522,12 @@ def _tokenize_query(q: str) -> list[str]:
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
 def _near_distance_for_tokens(n: int) -> int:
     """Calculate NEAR distance threshold based on token count."""
-    if n <= 1:
-        return 0
-    val = 2 * n - 1
-    if val < 3:
-        val = 3
-    if val > NEAR_DISTANCE:
-        val = NEAR_DISTANCE
-    return val
+    return 0 if n <= 1 else min(NEAR_DISTANCE, max(3, 2 * n - 1))
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
-def _build_fts_queries(raw_query: str) -> list[str]:
+@functools.lru_cache(maxsize=512)
+def _build_fts_queries(raw_query: str) -> tuple[str, ...]:
     """Generate prioritized FTS5 query variants for improved recall."""
     normalized_query = _normalize_search_text(raw_query)
     tokens = normalized_query.split() if normalized_query else []
@@ -415,7 +563,112 @@ def _build_fts_queries(raw_query: str) -> list[str]:
         if v not in seen:
             out.append(v)
             seen.add(v)
-    return out
+    return tuple(out)
+
+
+_FTS_RANK_FUNCTION = f"bm25({', '.join(str(weight) for weight in FTS_BM25_WEIGHTS)})"
+_FTS_VARIANT_SQL = """
+    SELECT *
+    FROM (SELECT m.key,
+                 m.value,
+                 m.scope,
+                 m.tags,
+                 m.tags_search,
+                 m.created_at,
+                 m.last_used_at,
+                 m.expires_ts AS expires_at,
+                 hits.rank AS rank,
+                 {priority} AS priority
+          FROM (SELECT rowid, rank
+                FROM mem_fts
+                WHERE mem_fts MATCH ?
+                  AND rank MATCH '{rank_function}'
+                ORDER BY rank
+                LIMIT ?) AS hits
+                   JOIN mem AS m
+                        ON m.id = hits.rowid{exclude}
+          ORDER BY hits.rank, m.last_used_at DESC
+          LIMIT ?)
+"""
+
+
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+def _fts_scan_limit(limit: int, exclude_count: int) -> int:
+    """Return how many ranked FTS hits to fetch before joining ``mem``.
+
+    Hits with equal bm25 scores are ordered by ``last_used_at`` only after the join, so the inner scan
+    over-fetches to keep recently used rows from being cut at the limit boundary. Each excluded key can
+    drop at most one more hit.
+    """
+    return limit * FTS_TIE_OVERFETCH + exclude_count
+
+
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+def _exclude_keys_clause(exclude_count: int) -> str:
+    """Return the ``NOT IN`` filter for excluded keys, or an empty string when nothing is excluded."""
+    if not exclude_count:
+        return ""
+    return f" WHERE m.key NOT IN ({', '.join('?' * exclude_count)})"
+
+
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+def _build_tag_match_query(tags_search: str) -> str:
+    """Build an FTS5 query matching any of the normalized tag tokens in the tags column."""
+    tokens = dict.fromkeys(tags_search.split())
+    return "tags: (" + " OR ".join(f'"{token}"' for token in tokens) + ")"
+
+
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+@functools.lru_cache(maxsize=64)
+def _build_fts_union_sql(variant_count: int, exclude_count: int = 0) -> str:
+    """Build one statement that runs every FTS variant and keeps each key's best-priority hit."""
+    exclude = _exclude_keys_clause(exclude_count)
+    variants = "UNION ALL".join(
+        _FTS_VARIANT_SQL.format(priority=priority, exclude=exclude, rank_function=_FTS_RANK_FUNCTION)
+        for priority in range(variant_count)
+    )
+    return f"""
+        WITH hits AS ({variants}),
+             ranked AS (SELECT *,
+                               ROW_NUMBER() OVER (
+                                   PARTITION BY key ORDER BY priority, rank, last_used_at DESC
+                                   ) AS key_rank
+                        FROM hits)
+        SELECT key, value, scope, tags, tags_search, created_at, last_used_at, expires_at, rank
+        FROM ranked
+        WHERE key_rank = 1
+        ORDER BY priority, rank, last_used_at DESC
+        LIMIT ?;
+    """
+
+
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+def _fts_rows_per_variant(
+    cur: sqlite3.Cursor,
+    match_variants: tuple[str, ...],
+    limit: int,
+    exclude_keys: tuple[str, ...] = (),
+) -> list[sqlite3.Row]:
+    """Run FTS variants one at a time, skipping any that SQLite rejects."""
+    sql = _FTS_VARIANT_SQL.format(
+        priority=0,
+        exclude=_exclude_keys_clause(len(exclude_keys)),
+        rank_function=_FTS_RANK_FUNCTION,
+    )
+    found_by_key: dict[str, sqlite3.Row] = {}
+    for mv in match_variants:
+        if len(found_by_key) >= limit:
+            break
+        try:
+            fetched = cur.execute(sql, (mv, _fts_scan_limit(limit, len(exclude_keys)), *exclude_keys, limit)).fetchall()
+        except sqlite3.Error as error:
+            log.warning(f"FTS variant failed: {error}")  # noqa: F821  # ty:ignore[unresolved-reference]
+            continue
+        for row in fetched:
+            found_by_key.setdefault(row["key"], row)
+            if len(found_by_key) >= limit:
+                break
+    return list(found_by_key.values())
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
@@ -429,7 +682,7 @@ def _fetch_with_expiry(cur: sqlite3.Cursor, key: str) -> tuple[bool, sqlite3.Row
                tags,
                created_at,
                last_used_at,
-               expires_at
+               expires_ts AS expires_at
         FROM mem
         WHERE key = ?;
         """,
@@ -437,12 +690,16 @@ def _fetch_with_expiry(cur: sqlite3.Cursor, key: str) -> tuple[bool, sqlite3.Row
     ).fetchone()
     if not row:
         return False, None
-    expires_at = row["expires_at"]
-    if expires_at:
-        dt = _dt_from_iso(expires_at)
-        if dt and datetime.now(UTC) > dt:
-            return True, row
-    return False, row
+    expires_ts = row["expires_at"]
+    return expires_ts is not None and time.time() > expires_ts, row
+
+
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+def _row_with_iso_expiry(row: sqlite3.Row) -> dict[str, Any]:
+    """Convert a fetched memory row to a dict, formatting its expiry as ISO 8601."""
+    data = dict(row)
+    data["expires_at"] = _iso_from_ts(data["expires_at"])
+    return data
 
 
 def _set_result(state_value: str = "ok", **attrs: Any) -> None:
@@ -454,59 +711,86 @@ def _set_result(state_value: str = "ok", **attrs: Any) -> None:
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
 def _reset_db_ready() -> None:
-    """Reset the database initialization flag."""
+    """Reset the database initialization flag and drop this thread's pooled connection."""
     global _DB_READY
     with _DB_READY_LOCK:
         _DB_READY = False
+    _close_db_connection()
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
-def _memory_set_db_sync(
-    key_norm: str,
-    value_norm: str,
-    scope_norm: str,
-    tags_raw: str,
-    tags_search: str,
-    now_iso: str,
-    expires_at: str | None,
-) -> bool:
-    """Synchronously persist a memory record to the database."""
+def _memory_set_many_db_sync(rows: list[tuple[Any, ...]]) -> list[bool]:
+    """Synchronously upsert a batch of memory records in a single transaction.
+
+    Returns, for each row, whether its key already existed when the row was written.
+    """
     for attempt in range(2):
         try:
             _ensure_db_once(force=attempt == 1)
-            with closing(_get_db_connection()) as conn:
-                cur = conn.cursor()
-                cur.execute(
+            with _get_db_connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                keys = list(dict.fromkeys(row[0] for row in rows))
+                existing = {
+                    found[0]
+                    for found in conn.execute(
+                        f"SELECT key FROM mem WHERE key IN ({', '.join('?' * len(keys))})",
+                        keys,
+                    )
+                }
+                existed: list[bool] = []
+                for row in rows:
+                    existed.append(row[0] in existing)
+                    existing.add(row[0])
+                conn.executemany(
                     """
-                    INSERT INTO mem(key, value, scope, tags, tags_search, created_at, last_used_at, expires_at)
+                    INSERT INTO mem(key, value, scope, tags, tags_search, created_at, last_used_at, expires_ts)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                     ON CONFLICT(key) DO UPDATE SET value=excluded.value,
                                                    scope=excluded.scope,
                                                    tags=excluded.tags,
                                                    tags_search=excluded.tags_search,
                                                    last_used_at=excluded.last_used_at,
-                                                   expires_at=excluded.expires_at
+                                                   expires_ts=excluded.expires_ts
                     """,
-                    (
-                        key_norm,
-                        value_norm,
-                        scope_norm,
-                        tags_raw,
-                        tags_search,
-                        now_iso,
-                        now_iso,
-                        expires_at,
-                    ),
+                    rows,
                 )
                 conn.commit()
-            return True
+            return existed
         except sqlite3.OperationalError:
             _reset_db_ready()
             if attempt == 0:
                 time.sleep(0.1)
                 continue
             raise
-    return False
+    return []
+
+
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+def _flush_pending_sets() -> None:
+    """Write queued memory_set rows on the writer thread, one transaction per batch."""
+    with _PENDING_SETS_LOCK:
+        batch = _PENDING_SETS[:SET_BATCH_MAX]
+        del _PENDING_SETS[:SET_BATCH_MAX]
+    if not batch:
+        return
+    try:
+        existed = _memory_set_many_db_sync([row for row, _ in batch])
+    except sqlite3.IntegrityError:
+        # One bad row must not fail the whole batch; retry each row in its own transaction.
+        for row, done in batch:
+            try:
+                (row_existed,) = _memory_set_many_db_sync([row])
+            except Exception as error:
+                done.set_exception(error)
+            else:
+                done.set_result(row_existed)
+        return
+    except Exception as error:
+        for _, done in batch:
+            done.set_exception(error)
+        return
+    for (_, done), row_existed in zip(batch, existed, strict=True):
+        done.set_result(row_existed)
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
@@ -515,7 +799,7 @@ def _memory_key_exists_db_sync(key_norm: str) -> bool:
     for attempt in range(2):
         try:
             _ensure_db_once(force=attempt == 1)
-            with closing(_get_db_connection()) as conn:
+            with _get_db_connection() as conn:
                 cur = conn.cursor()
                 row = cur.execute(
                     "SELECT 1 FROM mem WHERE key = ? LIMIT 1",
@@ -531,36 +815,47 @@ def _memory_key_exists_db_sync(key_norm: str) -> bool:
     return False
 
 
+@pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
+def _memory_set_lookup_db_sync(key_norm: str, tags_search: str, limit: int) -> tuple[bool, list[_SearchHit]]:
+    """Check whether a key exists and, for a new key, find records with overlapping tags."""
+    if _memory_key_exists_db_sync(key_norm):
+        return True, []
+    if not tags_search:
+        return False, []
+    try:
+        return False, _memory_search_db_sync(tags_search, limit, (key_norm,), True)
+    except sqlite3.Error as lookup_err:
+        log.error(f"memory set: duplicate lookup failed for '{tags_search}': {lookup_err}")  # noqa: F821  # ty:ignore[unresolved-reference]
+        return False, []
+
+
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
 def _memory_get_db_sync(key_norm: str) -> tuple[str, dict[str, Any] | None]:
     """Synchronously fetch a memory record and update its last-used timestamp."""
     for attempt in range(2):
         try:
             _ensure_db_once(force=attempt == 1)
-            with closing(_get_db_connection()) as conn:
+            with _get_db_connection() as conn:
                 cur = conn.cursor()
+                now_iso = _utcnow_iso()
+                row = cur.execute(
+                    """
+                    UPDATE mem
+                    SET last_used_at = ?
+                    WHERE key = ?
+                      AND (expires_ts IS NULL OR expires_ts >= ?)
+                    RETURNING key, value, scope, tags, created_at, last_used_at, expires_ts AS expires_at;
+                    """,
+                    (now_iso, key_norm, int(time.time())),
+                ).fetchone()
+                if row is not None:
+                    conn.commit()
+                    return "ok", _row_with_iso_expiry(row)
+                # Nothing refreshed: tell an expired key apart from a missing one.
                 expired, row = _fetch_with_expiry(cur, key_norm)
                 if row is None:
                     return "not_found", None
-                row_data = {
-                    "key": row["key"],
-                    "value": row["value"],
-                    "scope": row["scope"],
-                    "tags": row["tags"],
-                    "created_at": row["created_at"],
-                    "last_used_at": row["last_used_at"],
-                    "expires_at": row["expires_at"],
-                }
-                if expired:
-                    return "expired", row_data
-                last_used_iso = _utcnow_iso()
-                cur.execute(
-                    "UPDATE mem SET last_used_at=? WHERE key=?",
-                    (last_used_iso, key_norm),
-                )
-                conn.commit()
-            row_data["last_used_at"] = last_used_iso
-            return "ok", row_data
+                return ("expired" if expired else "ok"), _row_with_iso_expiry(row)
         except sqlite3.OperationalError:
             _reset_db_ready()
             if attempt == 0:
@@ -571,92 +866,98 @@ def _memory_get_db_sync(key_norm: str) -> tuple[str, dict[str, Any] | None]:
 
 
 @pyscript_compile  # noqa: F821  # ty:ignore[unresolved-reference]
-def _memory_search_db_sync(query: str, limit: int) -> list[dict[str, Any]]:
-    """Synchronously search for memory records matching the provided query."""
+def _memory_search_db_sync(
+    query: str,
+    limit: int,
+    exclude_keys: tuple[str, ...] = (),
+    tags_only: bool = False,
+) -> list[_SearchHit]:
+    """Synchronously search for memory records matching the provided query.
+
+    With ``tags_only`` the query is treated as normalized tags and matched against the tags column only.
+    """
     normalized_query = _normalize_search_text(query)
-    query_tokens = set(normalized_query.split()) if normalized_query else set()
+    query_tokens = _tag_tokens(normalized_query)
     for attempt in range(2):
         try:
             _ensure_db_once(force=attempt == 1)
-            with closing(_get_db_connection()) as conn:
+            with _get_db_connection() as conn:
                 cur = conn.cursor()
-                found_by_key: dict[str, sqlite3.Row] = {}
                 total_rows: list[sqlite3.Row] = []
-                match_variants = _build_fts_queries(query)
-
-                for mv in match_variants:
-                    if len(found_by_key) >= limit:
-                        break
+                if tags_only:
+                    match_variants = (_build_tag_match_query(normalized_query),) if normalized_query else ()
+                else:
+                    match_variants = _build_fts_queries(query)
+                if match_variants:
+                    fts_limit = _fts_scan_limit(limit, len(exclude_keys))
+                    params = [param for mv in match_variants for param in (mv, fts_limit, *exclude_keys, limit)]
+                    params.append(limit)
                     try:
-                        fetched = cur.execute(
-                            """
-                            SELECT DISTINCT m.key,
-                                            m.value,
-                                            m.scope,
-                                            m.tags,
-                                            m.tags_search,
-                                            m.created_at,
-                                            m.last_used_at,
-                                            m.expires_at,
-                                            mem_fts.rank AS rank
-                            FROM mem_fts
-                                     JOIN mem AS m
-                                          ON m.id = mem_fts.rowid
-                            WHERE mem_fts MATCH ?
-                            ORDER BY rank, m.last_used_at DESC
-                            LIMIT ?;
-                            """,
-                            (mv, limit),
+                        total_rows = cur.execute(
+                            _build_fts_union_sql(len(match_variants), len(exclude_keys)), params
                         ).fetchall()
                     except sqlite3.Error as error:
-                        log.warning(f"FTS variant failed: {error}")  # noqa: F821  # ty:ignore[unresolved-reference]
-                        continue
-                    for row in fetched:
-                        key = row["key"]
-                        if key not in found_by_key:
-                            found_by_key[key] = row
-                            total_rows.append(row)
-                        if len(found_by_key) >= limit:
-                            break
-                if not total_rows:
+                        log.warning(f"FTS combined query failed, retrying per variant: {error}")  # noqa: F821  # ty:ignore[unresolved-reference]
+                        total_rows = _fts_rows_per_variant(cur, match_variants, limit, exclude_keys)
+                if not total_rows and not tags_only and len(normalized_query) >= 3:
+                    # The trigram index answers substring matches; it needs at least one full trigram.
+                    total_rows = cur.execute(
+                        """
+                        SELECT m.key,
+                               m.value,
+                               m.scope,
+                               m.tags,
+                               m.tags_search,
+                               m.created_at,
+                               m.last_used_at,
+                               m.expires_ts AS expires_at,
+                               NULL AS rank
+                        FROM mem_trigram
+                                 JOIN mem AS m
+                                      ON m.id = mem_trigram.rowid
+                        WHERE mem_trigram MATCH ?
+                        ORDER BY m.last_used_at DESC
+                        LIMIT ?;
+                        """,
+                        (f'"{normalized_query}"', limit),
+                    ).fetchall()
+                elif not total_rows and not tags_only:
                     like_q = f"%{normalized_query}%"
                     total_rows = cur.execute(
                         """
-                        SELECT DISTINCT m.key,
-                                        m.value,
-                                        m.scope,
-                                        m.tags,
-                                        m.tags_search,
-                                        m.created_at,
-                                        m.last_used_at,
-                                        m.expires_at,
-                                        NULL AS rank
+                        SELECT m.key,
+                               m.value,
+                               m.scope,
+                               m.tags,
+                               m.tags_search,
+                               m.created_at,
+                               m.last_used_at,
+                               m.expires_ts AS expires_at,
+                               NULL AS rank
                         FROM mem AS m
                         WHERE m.value LIKE ?
-                           OR m.tags LIKE ?
                            OR m.tags_search LIKE ?
                            OR m.key LIKE ?
                         ORDER BY m.last_used_at DESC
                         LIMIT ?;
                         """,
-                        (like_q, like_q, like_q, like_q, limit),
+                        (like_q, like_q, like_q, limit),
                     ).fetchall()
-            results: list[dict[str, Any]] = []
+            results: list[_SearchHit] = []
             for row in total_rows:
-                candidate_source = row["tags_search"] or _normalize_tags(row["tags"])
-                candidate_tokens = {token for token in candidate_source.split() if token}
+                candidate_tokens = _tag_tokens(row["tags_search"] or _normalize_tags(row["tags"]))
                 match_score = _calculate_match_score(query_tokens, candidate_tokens, row["rank"])
                 results.append(
-                    {
-                        "key": row["key"],
-                        "value": row["value"],
-                        "scope": row["scope"],
-                        "tags": row["tags"],
-                        "created_at": row["created_at"],
-                        "last_used_at": row["last_used_at"],
-                        "expires_at": row["expires_at"],
-                        "match_score": match_score,
-                    }
+                    _SearchHit(
+                        row["key"],
+                        row["value"],
+                        row["scope"],
+                        row["tags"],
+                        row["created_at"],
+                        row["last_used_at"],
+                        _iso_from_ts(row["expires_at"]),
+                        match_score,
+                    )
                 )
             return results
         except sqlite3.OperationalError:
@@ -674,7 +975,7 @@ def _memory_forget_db_sync(key_norm: str) -> int:
     for attempt in range(2):
         try:
             _ensure_db_once(force=attempt == 1)
-            with closing(_get_db_connection()) as conn:
+            with _get_db_connection() as conn:
                 cur = conn.cursor()
                 cur.execute("DELETE FROM mem WHERE key=?", (key_norm,))
                 rowcount = getattr(cur, "rowcount", -1)
@@ -694,16 +995,15 @@ def _memory_forget_db_sync(key_norm: str) -> int:
 def _memory_purge_expired_db_sync(grace_days: int = 0) -> int:
     """Synchronously remove expired memory records."""
     grace = max(int(grace_days), 0)
-    cutoff_dt = datetime.now(UTC) - timedelta(days=grace)
-    cutoff_iso = cutoff_dt.isoformat()
+    cutoff_ts = int(time.time()) - grace * SECONDS_PER_DAY
     for attempt in range(2):
         try:
             _ensure_db_once(force=attempt == 1)
-            with closing(_get_db_connection()) as conn:
+            with _get_db_connection() as conn:
                 cur = conn.cursor()
                 cur.execute(
-                    "DELETE FROM mem WHERE expires_at IS NOT NULL AND expires_at < ?",
-                    (cutoff_iso,),
+                    "DELETE FROM mem WHERE expires_ts < ?",
+                    (cutoff_ts,),
                 )
                 rowcount = getattr(cur, "rowcount", -1)
                 removed = rowcount if rowcount and rowcount > 0 else 0
@@ -724,7 +1024,7 @@ def _memory_reindex_fts_db_sync() -> tuple[int, int]:
     for attempt in range(2):
         try:
             _ensure_db_once(force=attempt == 1)
-            with closing(_get_db_connection()) as conn:
+            with _get_db_connection() as conn:
                 cur = conn.cursor()
                 cur.execute("BEGIN IMMEDIATE")
                 try:
@@ -734,57 +1034,13 @@ def _memory_reindex_fts_db_sync() -> tuple[int, int]:
                     before = 0
 
                 cur.execute("DROP TABLE IF EXISTS mem_fts")
-                cur.execute(
-                    """
-                    CREATE VIRTUAL TABLE mem_fts USING fts5(
-                        key, value, tags,
-                        content='mem',
-                        content_rowid='id',
-                        tokenize = 'unicode61 remove_diacritics 2'
-                    );
-                    """
-                )
-
-                cur.executescript(
-                    """
-                    CREATE TRIGGER IF NOT EXISTS mem_ai
-                        AFTER INSERT
-                        ON mem
-                    BEGIN
-                        INSERT INTO mem_fts(rowid, key, value, tags)
-                        VALUES (new.id,
-                                new.key,
-                                new.value,
-                                new.tags_search);
-                    END;
-
-                    CREATE TRIGGER IF NOT EXISTS mem_ad
-                        AFTER DELETE
-                        ON mem
-                    BEGIN
-                        INSERT INTO mem_fts(mem_fts, rowid, key, value, tags)
-                        VALUES ('delete', old.id, old.key, old.value, old.tags_search);
-                    END;
-
-                    CREATE TRIGGER IF NOT EXISTS mem_au
-                        AFTER UPDATE OF key, value, tags_search
-                        ON mem
-                        WHEN (old.key IS NOT new.key)
-                            OR (old.value IS NOT new.value)
-                            OR (old.tags_search IS NOT new.tags_search)
-                    BEGIN
-                        INSERT INTO mem_fts(mem_fts, rowid, key, value, tags)
-                        VALUES ('delete', old.id, old.key, old.value, old.tags_search);
-                        INSERT INTO mem_fts(rowid, key, value, tags)
-                        VALUES (new.id,
-                                new.key,
-                                new.value,
-                                new.tags_search);
-                    END;
-                    """
-                )
-
+                cur.execute("DROP TABLE IF EXISTS mem_trigram")
+                cur.execute(_FTS_TABLE_DDL)
+                cur.execute(_TRIGRAM_TABLE_DDL)
+                for statement in _FTS_TRIGGERS_DDL:
+                    cur.execute(statement)
                 cur.execute("INSERT INTO mem_fts(mem_fts) VALUES('rebuild')")
+                cur.execute("INSERT INTO mem_trigram(mem_trigram) VALUES('rebuild')")
                 cur.execute("SELECT COUNT(*) FROM mem_fts")
                 after = cur.fetchone()[0]
                 conn.commit()
@@ -804,14 +1060,13 @@ def _memory_health_check_db_sync() -> tuple[int, int, int]:
     for attempt in range(2):
         try:
             _ensure_db_once(force=attempt == 1)
-            with closing(_get_db_connection()) as conn:
+            with _get_db_connection() as conn:
                 cur = conn.cursor()
                 cur.execute("SELECT COUNT(*) FROM mem")
                 rows = cur.fetchone()[0]
-                now_iso = _utcnow_iso()
                 cur.execute(
-                    "SELECT COUNT(*) FROM mem WHERE expires_at IS NOT NULL AND expires_at < ?",
-                    (now_iso,),
+                    "SELECT COUNT(*) FROM mem WHERE expires_ts < ?",
+                    (int(time.time()),),
                 )
                 expired = cur.fetchone()[0]
                 cur.execute("SELECT COUNT(*) FROM mem_fts")
@@ -826,6 +1081,11 @@ def _memory_health_check_db_sync() -> tuple[int, int, int]:
     return 0, 0, 0
 
 
+async def _run_db_write(func: Callable[..., Any], *args: Any) -> Any:
+    """Run a synchronous write on the dedicated writer thread."""
+    return await asyncio.get_running_loop().run_in_executor(_DB_WRITER, func, *args)
+
+
 async def _memory_set_db(
     key_norm: str,
     value_norm: str,
@@ -833,24 +1093,21 @@ async def _memory_set_db(
     tags_raw: str,
     tags_search: str,
     now_iso: str,
-    expires_at: str | None,
+    expires_ts: int | None,
 ) -> bool:
-    """Async wrapper for persisting a memory record."""
-    return await asyncio.to_thread(
-        _memory_set_db_sync,
-        key_norm,
-        value_norm,
-        scope_norm,
-        tags_raw,
-        tags_search,
-        now_iso,
-        expires_at,
-    )
+    """Queue a memory record for the writer thread; return whether the key existed once committed."""
+    done: Future[bool] = Future()
+    with _PENDING_SETS_LOCK:
+        _PENDING_SETS.append(
+            ((key_norm, value_norm, scope_norm, tags_raw, tags_search, now_iso, now_iso, expires_ts), done)
+        )
+    await _run_db_write(_flush_pending_sets)
+    return await asyncio.wrap_future(done)
 
 
-async def _memory_key_exists_db(key_norm: str) -> bool:
-    """Async wrapper for checking key existence."""
-    return await asyncio.to_thread(_memory_key_exists_db_sync, key_norm)
+async def _memory_set_lookup_db(key_norm: str, tags_search: str, limit: int) -> tuple[bool, list[_SearchHit]]:
+    """Async wrapper for the pre-write existence and duplicate-tag lookup."""
+    return await asyncio.to_thread(_memory_set_lookup_db_sync, key_norm, tags_search, limit)
 
 
 async def _memory_get_db(key_norm: str) -> tuple[str, dict[str, Any] | None]:
@@ -858,24 +1115,29 @@ async def _memory_get_db(key_norm: str) -> tuple[str, dict[str, Any] | None]:
     return await asyncio.to_thread(_memory_get_db_sync, key_norm)
 
 
-async def _memory_search_db(query: str, limit: int) -> list[dict[str, Any]]:
+async def _memory_search_db(
+    query: str,
+    limit: int,
+    exclude_keys: tuple[str, ...] = (),
+    tags_only: bool = False,
+) -> list[_SearchHit]:
     """Async wrapper for searching memory records."""
-    return await asyncio.to_thread(_memory_search_db_sync, query, limit)
+    return await asyncio.to_thread(_memory_search_db_sync, query, limit, exclude_keys, tags_only)
 
 
 async def _memory_forget_db(key_norm: str) -> int:
     """Async wrapper for deleting a memory record."""
-    return await asyncio.to_thread(_memory_forget_db_sync, key_norm)
+    return await _run_db_write(_memory_forget_db_sync, key_norm)
 
 
 async def _memory_purge_expired_db(grace_days: int = 0) -> int:
     """Async wrapper for removing expired memory records."""
-    return await asyncio.to_thread(_memory_purge_expired_db_sync, grace_days)
+    return await _run_db_write(_memory_purge_expired_db_sync, grace_days)
 
 
 async def _memory_reindex_fts_db() -> tuple[int, int]:
     """Async wrapper for rebuilding the FTS index."""
-    return await asyncio.to_thread(_memory_reindex_fts_db_sync)
+    return await _run_db_write(_memory_reindex_fts_db_sync)
 
 
 async def _memory_health_check_db() -> tuple[int, int, int]:
@@ -985,20 +1247,11 @@ async def memory_set(
         tags_raw = _normalize_value(tags) if tags else _normalize_value(key)
         tags_search = _normalize_tags(tags_raw)
 
-        now = datetime.now(UTC)
-        now_iso = now.isoformat()
-        expires_at = (now + timedelta(days=expiration_days_i)).isoformat() if expiration_days_i else None
-
-        key_exists = await _memory_key_exists_db(key_norm)
+        now_iso, expires_ts = _set_timestamps(expiration_days_i)
+        expires_at = _iso_from_ts(expires_ts)
 
-        duplicate_matches: list[tuple[dict[str, Any], float]] = []
-        if not key_exists and tags_search:
-            duplicate_matches = await _search_tag_candidates(
-                tags_search,
-                exclude_keys={key_norm},
-                limit=CANDIDATE_CHECK_LIMIT,
-                log_context="set: duplicate lookup",
-            )
+        key_exists, raw_matches = await _memory_set_lookup_db(key_norm, tags_search, CANDIDATE_CHECK_LIMIT)
+        duplicate_matches = _rank_tag_candidates(raw_matches, CANDIDATE_CHECK_LIMIT)
 
         duplicate_options: list[dict[str, Any]] = []
         if duplicate_matches:
@@ -1028,24 +1281,17 @@ async def memory_set(
             forced_duplicate_override = True
             log.warning("memory_set: duplicate tags override forced by force_new")  # noqa: F821  # ty:ignore[unresolved-reference]
 
-        ok_db = await _memory_set_db(
+        # The write reports whether the key existed at commit time, closing the gap since the lookup above.
+        key_exists = await _memory_set_db(
             key_norm=key_norm,
             value_norm=value_norm,
             scope_norm=scope_norm,
             tags_raw=tags_raw,
             tags_search=tags_search,
             now_iso=now_iso,
-            expires_at=expires_at,
+            expires_ts=expires_ts,
         )
 
-        if not ok_db:
-            return {
-                "status": "error",
-                "op": "set",
-                "key": key_norm,
-                "error": "memory_set_db returned False",
-            }
-
         result_details: dict[str, Any] = {
             "value": value_norm,
             "scope": scope_norm,
@@ -1150,7 +1396,7 @@ async def memory_search(query: str, limit: int = 5):
     """
     yaml
     name: Memory Search
-    description: Search entries across key/value/tags using FTS; falls back to LIKE if MATCH fails.
+    description: Search entries across key/value/tags using FTS; falls back to substring matching when MATCH finds none.
     fields:
       query:
         name: Query
@@ -1188,7 +1434,7 @@ async def memory_search(query: str, limit: int = 5):
         lim = SEARCH_LIMIT_MAX
 
     try:
-        results = await _memory_search_db(query, lim)
+        results = [hit._asdict() for hit in await _memory_search_db(query, lim)]
     except Exception as e:
         log.error(f"memory_search failed: {e}")  # noqa: F821  # ty:ignore[unresolved-reference]
         _set_result("error", op="search", query=query, error=str(e))
@@ -1386,3 +1632,9 @@ async def memory_daily_housekeeping():
         await memory_purge_expired(grace_days=HOUSEKEEPING_GRACE_DAYS)
     except Exception as e:
         log.error(f"memory_daily_housekeeping failed: {e}")  # noqa: F821  # ty:ignore[unresolved-reference]
+
+
+@time_trigger("shutdown")  # noqa: F821  # ty:ignore[unresolved-reference]
+def _shutdown_db_writer() -> None:
+    """Stop the writer thread when the script is unloaded."""
+    _DB_WRITER.shutdown(wait=False)